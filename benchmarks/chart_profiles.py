@@ -0,0 +1,81 @@
+"""
+Render time of the charts and size of the final PDF for each chart profile.
+Run it from the repository root:
+
+    python -m benchmarks.chart_profiles --year-month 2024-01 --dpi 150
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+from src.business_auto_report import (
+    CHART_PAGES,
+    BusinessAutoReport,
+    get_dataset_output,
+)
+from src.charts import CHART_PROFILES, Charts
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def benchmark_profile(
+    bar: BusinessAutoReport, year_month: str, profile: str, dpi: int
+) -> Dict[str, float]:
+    # Serial and uncached, to time the rendering itself
+    bar.ch = Charts(workers=1, profile=profile, dpi=dpi)
+    bar.ch.cache = None
+    dataset = bar.dm.get_report_dataset(year_month)
+    chart_dfs = [
+        (chart_name, get_dataset_output(dataset, df_name))
+        for chart_name, df_name in CHART_PAGES
+    ]
+
+    # As the report's chart steps do
+    start = time.perf_counter()
+    for chart_name, df in chart_dfs:
+        bar.ch.render_chart(chart_name, df)
+    render_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pdf = bar.build_report_bytes(year_month)
+    report_s = time.perf_counter() - start
+    return {
+        "profile": profile,
+        "dpi": dpi,
+        "render_s": round(render_s, 3),
+        "report_s": round(report_s, 3),
+        "pdf_bytes": len(pdf),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--db", default=os.path.join(ROOT_PATH, "database.db"))
+    parser.add_argument("--year-month", default="2024-01")
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    bar = BusinessAutoReport(args.db)
+    results: List[Dict[str, float]] = []
+    for profile in CHART_PROFILES:
+        results.append(
+            benchmark_profile(bar, args.year_month, profile, args.dpi)
+        )
+
+    print(f"{'profile':<8} {'render s':>9} {'report s':>9} {'PDF KiB':>9}")
+    for result in results:
+        print(
+            f"{result['profile']:<8} {result['render_s']:>9.3f} "
+            f"{result['report_s']:>9.3f} {result['pdf_bytes'] / 1024:>9.1f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Measure the memory of the monthly totals by product and category a report
+is built from, as categorical frames against the same frames keyed by
+strings, and the peak allocated while deriving the monthly KPIs from each.
+Run it from the repository root:
+
+    python -m benchmarks.memory_footprint --db synthetic.db
+"""
+
+import argparse
+import os
+import tracemalloc
+from typing import Callable, Tuple
+
+import pandas as pd
+
+from src.data_manager import DataManager
+from src.report_dataset import get_monthly_kpis_df
+from src.shared_facts import EXPENSES, SALES, SharedFacts
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_peak_memory(func: Callable[[], object]) -> Tuple[object, int]:
+    """Result of the function and the peak memory it allocated, in bytes"""
+
+    tracemalloc.start()
+    try:
+        result = func()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def get_frame_memory(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def as_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """The frame with its keys as strings, as SQLite queries return them"""
+
+    return df.astype(
+        {
+            column: str
+            for column in df.columns
+            if column in ("year_month", "product", "category")
+        }
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--db", default=os.path.join(ROOT_PATH, "database.db"))
+    parser.add_argument(
+        "--year-month", help="month to report on (default: latest)"
+    )
+    args = parser.parse_args()
+
+    dm = DataManager(args.db)
+    year_month = args.year_month or dm.get_latest_db_year_month()
+    window = dm._get_report_window(year_month)
+    facts = SharedFacts.create(dm.db, window[0])
+    try:
+        df_sales = facts.get_report_df(SALES, window)
+        df_expenses = facts.get_report_df(EXPENSES, window)
+        print(f"{'frame':<22}{'rows':>10}{'strings':>12}{'categorical':>14}")
+        for name, df in (
+            ("sales by product", df_sales),
+            ("expenses by category", df_expenses),
+        ):
+            print(
+                f"{name:<22}{len(df):>10,}"
+                f"{get_frame_memory(as_strings(df)) / 1024:>10.0f}KB"
+                f"{get_frame_memory(df) / 1024:>12.0f}KB"
+            )
+
+        string_sales = as_strings(df_sales)
+        string_expenses = as_strings(df_expenses)
+        _, string_peak = get_peak_memory(
+            lambda: get_monthly_kpis_df(string_sales, string_expenses)
+        )
+        _, categorical_peak = get_peak_memory(
+            lambda: get_monthly_kpis_df(df_sales, df_expenses)
+        )
+        print(
+            f"{'monthly KPIs peak':<32}{string_peak / 1024:>10.0f}KB"
+            f"{categorical_peak / 1024:>12.0f}KB"
+        )
+    finally:
+        facts.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Time every DataManager method, every chart, the PDF assembly and the whole
+report generation, recording the peak RSS, into a JSON results file that
+can be compared across commits. Run it from the repository root:
+
+    python -m benchmarks.run_benchmarks --db synthetic.db --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DATA_MANAGER_METHODS = [
+    "get_report_dataset",
+    "get_month_overview",
+    "get_total_expenses_by_category_df",
+    "get_homologous_performance",
+    "get_homologous_df",
+    "get_in_chain_performance",
+    "get_12_months_df",
+    "get_homologous_ytd_gross_df",
+    "get_homologous_ytd_df",
+    "get_total_sales_by_product_df",
+]
+
+
+class Benchmarks:
+    def __init__(self, repeat: int) -> None:
+        self.repeat = repeat
+        self.results: List[Dict[str, Any]] = []
+
+    def measure(self, name: str, func: Callable[[], Any]) -> Any:
+        """Keep the best time of the repeats, return the last result"""
+
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        self.results.append(
+            {
+                "name": name,
+                "seconds": round(min(timings), 6),
+                "peak_rss_mb": round(get_peak_rss_mb(), 1),
+            }
+        )
+        print(f"{min(timings):10.4f}s  {get_peak_rss_mb():8.1f} MB  {name}")
+        return result
+
+
+def get_peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT_PATH,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_db_stats(db_path: str) -> Dict[str, int]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in (
+                "sales_fact",
+                "expenses_fact",
+                "products_dim",
+                "expenses_categories_dim",
+            )
+        }
+    finally:
+        conn.close()
+
+
+def run(db_path: str, year_month: Optional[str], repeat: int) -> Dict:
+    bench = Benchmarks(repeat)
+    # Once: the first refresh builds the rollups, the next ones are no-ops
+    once = Benchmarks(1)
+    from src.data_manager import DataManager
+
+    dm = once.measure("DataManager.__init__", lambda: DataManager(db_path))
+    year_month = year_month or dm.get_latest_db_year_month()
+
+    bench.measure(
+        "DataManager.get_latest_db_year_month", dm.get_latest_db_year_month
+    )
+    for method in DATA_MANAGER_METHODS:
+        bench.measure(
+            f"DataManager.{method}",
+            lambda: getattr(dm, method)(year_month),
+        )
+
+    from src.business_auto_report import (
+        CHART_PAGES,
+        TEXT_SECTIONS,
+        BusinessAutoReport,
+        get_dataset_output,
+    )
+    from src.charts import Charts
+
+    bar = BusinessAutoReport(db_path, chart_workers=1)
+    bar.ch = Charts(workers=1)
+    bar.ch.cache = None  # Time the rendering, not the cache
+    dataset = dm.get_report_dataset(year_month)
+    charts = []
+    # As the report's chart steps do
+    for chart_name, df_name in CHART_PAGES:
+        df = get_dataset_output(dataset, df_name)
+        charts.append(
+            bench.measure(
+                f"Charts.{chart_name}",
+                lambda: bar.ch.render_chart(chart_name, df),
+            )
+        )
+
+    from src.pdf_report import PDFReport
+
+    sections = tuple(
+        getattr(dataset, f"get_{name}")() for name, _ in TEXT_SECTIONS
+    )
+
+    def assemble_pdf() -> bytes:
+        pdf_rep = PDFReport(year_month)
+        bar._add_text_sections(pdf_rep, sections)
+        return pdf_rep.generate_report(charts)
+
+    bench.measure("PDFReport.generate_report", assemble_pdf)
+    bench.measure(
+        "BusinessAutoReport.build_report_bytes",
+        lambda: bar.build_report_bytes(year_month),
+    )
+    return {
+        "commit": get_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "year_month": year_month,
+        "repeat": repeat,
+        "db": get_db_stats(db_path),
+        "results": once.results + bench.results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--db", default=os.path.join(ROOT_PATH, "database.db"))
+    parser.add_argument(
+        "--year-month", help="month to report on (default: latest)"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = run(args.db, args.year_month, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
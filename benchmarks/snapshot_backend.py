@@ -0,0 +1,75 @@
+"""
+Compare the report queries on SQLite with the columnar snapshot backend,
+after exporting the snapshot from scratch. Run it from the repository root:
+
+    python -m benchmarks.snapshot_backend --db synthetic.db
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Dict
+
+from src.data_manager import DataManager
+from src.snapshot import Snapshot
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "get_report_versions",
+    "get_report_monthly_df",
+    "get_month_sales_df",
+    "get_month_expenses_df",
+    "get_report_dataset",
+]
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Best time of the repeats, in milliseconds"""
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--db", default=os.path.join(ROOT_PATH, "database.db"))
+    parser.add_argument(
+        "--year-month", help="month to report on (default: latest)"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        sqlite_dm = DataManager(args.db, backend="sqlite")
+        snapshot_dm = DataManager(args.db, backend="snapshot")
+        snapshot_dm.snapshot = Snapshot(snapshot_dir)
+        start = time.perf_counter()
+        snapshot_dm.snapshot.export(sqlite_dm.db)
+        print(f"Snapshot exported in {time.perf_counter() - start:.2f}s.")
+        year_month = args.year_month or sqlite_dm.get_latest_db_year_month()
+
+        print(f"{'query':<26}{'sqlite':>12}{'snapshot':>12}")
+        for query in QUERIES:
+            timings: Dict[str, float] = {
+                backend: measure(
+                    lambda: getattr(dm, query)(year_month), args.repeat
+                )
+                for backend, dm in (
+                    ("sqlite", sqlite_dm),
+                    ("snapshot", snapshot_dm),
+                )
+            }
+            print(
+                f"{query:<26}{timings['sqlite']:>10.2f}ms"
+                f"{timings['snapshot']:>10.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Fail, with a non-zero exit status, if the CLI's fast path imports any
+heavy library or takes longer than its import time budget to start.
+Run it from the repository root:
+
+    python -m benchmarks.startup_budget --budget-ms 150
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed once a report is built
+HEAVY_MODULES = (
+    "pandas",
+    "matplotlib",
+    "seaborn",
+    "reportlab",
+    "fitz",
+    "pymupdf",
+    "tqdm",
+)
+
+# Import time of the fast path, in milliseconds
+STARTUP_BUDGET_MS = 150
+
+
+def get_import_times(command: List[str]) -> List[Tuple[str, int, bool]]:
+    """
+    Name, cumulative import time in microseconds and whether it's a top
+    level import, of every module the command imports
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        is_top_level = not name.startswith("  ")  # Nested ones are indented
+        import_times.append((name.strip(), int(cumulative_us), is_top_level))
+    return import_times
+
+
+def get_heavy_modules(import_times: List[Tuple[str, int, bool]]) -> List[str]:
+    """Top level packages of the heavy modules among the imported ones"""
+
+    return sorted(
+        {
+            name.split(".")[0]
+            for name, _, _ in import_times
+            if name.split(".")[0] in HEAVY_MODULES
+        }
+    )
+
+
+def get_total_ms(import_times: List[Tuple[str, int, bool]]) -> float:
+    """Import time of the top level imports, which include the nested ones"""
+
+    return sum(us for _, us, is_top in import_times if is_top) / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--db", default=os.path.join(ROOT_PATH, "database.db"))
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+
+    command = ["main.py", "--db", args.db, "--list-months"]
+    import_times = get_import_times(command)
+    heavy = get_heavy_modules(import_times)
+    top_level = [(name, us) for name, us, is_top in import_times if is_top]
+    total_ms = get_total_ms(import_times)
+    slowest = sorted(top_level, key=lambda item: -item[1])[:5]
+
+    print(f"Import time of {' '.join(command)}: {total_ms:.1f} ms")
+    for name, cumulative_us in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    if heavy:
+        sys.exit(f"Heavy modules imported at startup: {', '.join(heavy)}")
+    if total_ms > args.budget_ms:
+        sys.exit(f"Over the {args.budget_ms:.0f} ms startup budget")
+    print(f"Within the {args.budget_ms:.0f} ms startup budget.")
+
+
+if __name__ == "__main__":
+    main()
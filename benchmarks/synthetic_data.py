@@ -0,0 +1,163 @@
+"""
+Generate a synthetic database, with the schema of sql/tables_creation.sql,
+at production scale. Run it from the repository root:
+
+    python -m benchmarks.synthetic_data synthetic.db --sales-rows 10000000
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Categories the reports single out, always generated
+CATEGORIES = [
+    "COGS",
+    "Wages",
+    "Rent",
+    "Utilities",
+    "Insurance",
+    "Marketing",
+    "Depreciation",
+    "Interest",
+    "Misc",
+]
+
+CHUNK_ROWS = 1_000_000
+
+
+class SyntheticData:
+    def __init__(
+        self,
+        db_path: str,
+        first_year: int,
+        years: int,
+        seed: int = 0,
+    ) -> None:
+        self.db_path = db_path
+        self.first_day = np.datetime64(f"{first_year}-01-01")
+        self.num_days = (
+            np.datetime64(f"{first_year + years}-01-01") - self.first_day
+        ).astype(int)
+        self.rng = np.random.default_rng(seed)
+
+    def generate(
+        self,
+        sales_rows: int,
+        expenses_rows: int,
+        products: int,
+        categories: int,
+    ) -> None:
+        if os.path.exists(self.db_path):
+            raise FileExistsError(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # Nothing to recover from if the generation fails halfway
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            with open(
+                os.path.join(ROOT_PATH, "sql", "tables_creation.sql")
+            ) as f:
+                conn.executescript(f.read())
+            with conn:
+                self._insert_products(conn, products)
+                self._insert_categories(conn, categories)
+                conn.executemany(
+                    "INSERT INTO sales_fact (date, product_id, quantity) "
+                    "VALUES (?, ?, ?)",
+                    self._generate_sales(sales_rows, products),
+                )
+                conn.executemany(
+                    "INSERT INTO expenses_fact (date, category_id, amount) "
+                    "VALUES (?, ?, ?)",
+                    self._generate_expenses(expenses_rows, categories),
+                )
+        finally:
+            conn.close()
+
+    def _insert_products(self, conn: sqlite3.Connection, products: int) -> None:
+        prices = np.round(self.rng.lognormal(3, 1, products), 2)
+        conn.executemany(
+            "INSERT INTO products_dim VALUES (?, ?, ?)",
+            (
+                (product_id, f"Product {product_id}", float(price))
+                for product_id, price in enumerate(prices, start=1)
+            ),
+        )
+
+    def _insert_categories(
+        self, conn: sqlite3.Connection, categories: int
+    ) -> None:
+        names = CATEGORIES + [
+            f"Category {number}"
+            for number in range(len(CATEGORIES) + 1, categories + 1)
+        ]
+        conn.executemany(
+            "INSERT INTO expenses_categories_dim VALUES (?, ?)",
+            enumerate(names, start=1),
+        )
+
+    def _generate_sales(
+        self, rows: int, products: int
+    ) -> Iterator[Tuple[str, int, int]]:
+        # Skewed, so a few products sell much more than the rest
+        weights = 1 / np.arange(1, products + 1)
+        weights /= weights.sum()
+        for dates, size in self._generate_dates(rows):
+            product_ids = self.rng.choice(products, size, p=weights) + 1
+            quantities = self.rng.integers(1, 6, size)
+            yield from zip(dates, product_ids.tolist(), quantities.tolist())
+
+    def _generate_expenses(
+        self, rows: int, categories: int
+    ) -> Iterator[Tuple[str, int, float]]:
+        num_categories = max(categories, len(CATEGORIES))
+        for dates, size in self._generate_dates(rows):
+            category_ids = self.rng.integers(1, num_categories + 1, size)
+            amounts = np.round(self.rng.lognormal(5, 1, size), 2)
+            yield from zip(dates, category_ids.tolist(), amounts.tolist())
+
+    def _generate_dates(self, rows: int) -> Iterator[Tuple[List[str], int]]:
+        """Sorted dates in chunks, so ids follow the dates like real data"""
+
+        for start in range(0, rows, CHUNK_ROWS):
+            size = min(CHUNK_ROWS, rows - start)
+            first_day = start * self.num_days // rows
+            last_day = (start + size) * self.num_days // rows
+            days = np.sort(
+                self.rng.integers(first_day, max(last_day, first_day + 1), size)
+            )
+            yield (self.first_day + days).astype(str).tolist(), size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("db_path", help="database to create")
+    parser.add_argument("--sales-rows", type=int, default=1_000_000)
+    parser.add_argument("--expenses-rows", type=int, default=250_000)
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--categories", type=int, default=len(CATEGORIES))
+    parser.add_argument("--first-year", type=int, default=2015)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    SyntheticData(
+        args.db_path, args.first_year, args.years, args.seed
+    ).generate(
+        args.sales_rows, args.expenses_rows, args.products, args.categories
+    )
+    print(
+        f"Generated {args.sales_rows:,} sales and {args.expenses_rows:,} "
+        f"expenses rows in {time.perf_counter() - start:.1f}s."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,238 @@
 #!/usr/bin/python3
 
+import argparse
+import sqlite3
+import sys
+import time
+
+from src.batch import BatchReport
 from src.business_auto_report import BusinessAutoReport
+from src.data_manager import DataManager
+from src.database import FullScanError
+from src.date_utils import DateUtils
+from src.ingestion import BulkLoader, IngestionError
+from src.rollups import Rollups
+
+
+def year_month_arg(value: str) -> str:
+    try:
+        year, month = map(int, value.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid year-month: {value}")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"invalid month: {value}")
+    return f"{year}-{month:02d}"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Business Auto Report")
+    parser.add_argument(
+        "--db",
+        metavar="PATH",
+        help="path of the SQLite database (default: database.db)",
+    )
+    parser.add_argument(
+        "--list-months",
+        action="store_true",
+        help="print the first and latest year-months in the database",
+    )
+    parser.add_argument(
+        "--warm-cache",
+        action="store_true",
+        help="build matplotlib's font cache ahead of the first report",
+    )
+    parser.add_argument(
+        "--check-query-plans",
+        metavar="YEAR_MONTH",
+        help="fail if any report query for the year-month does a full scan",
+    )
+    parser.add_argument(
+        "--rebuild-rollups",
+        metavar="YEAR_MONTH",
+        nargs="+",
+        help="recompute the monthly rollups of the year-months",
+    )
+    parser.add_argument(
+        "--export-snapshot",
+        action="store_true",
+        help="update the columnar snapshot read by the snapshot backend",
+    )
+    parser.add_argument(
+        "--load-sales",
+        metavar="FILE",
+        nargs="+",
+        help="bulk load CSV or Parquet files (date, product, quantity)",
+    )
+    parser.add_argument(
+        "--load-expenses",
+        metavar="FILE",
+        nargs="+",
+        help="bulk load CSV or Parquet files (date, category, amount)",
+    )
+    parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help="rebuild the fact indexes after the load instead of during it",
+    )
+    parser.add_argument(
+        "--export-kpis",
+        metavar="FILE",
+        help="write the KPIs of the --from/--to months (default: all) to a "
+        ".json, .csv or .parquet file, without building the reports",
+    )
+    parser.add_argument(
+        "--from",
+        dest="from_ym",
+        metavar="YEAR_MONTH",
+        type=year_month_arg,
+        help="generate, without prompts, the reports from this year-month",
+    )
+    parser.add_argument(
+        "--to",
+        dest="to_ym",
+        metavar="YEAR_MONTH",
+        type=year_month_arg,
+        help="last year-month of the batch (default: latest in the database)",
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="regenerate the reports whose data changed since they were built",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="serve PDF reports and KPI JSON over HTTP until interrupted",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="local port of the server (default: 8765)",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="serve on this Unix socket instead of the port",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="processes generating the batch or update, or reports the "
+        "server builds at once (default: CPUs)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="DIR",
+        help="write a timing and SQL trace of each report into the directory",
+    )
+    return parser.parse_args()
+
+
+def generate_batch(args: argparse.Namespace) -> None:
+    dm = DataManager(args.db)
+    first_ym = dm.get_first_db_year_month()
+    latest_ym = dm.get_latest_db_year_month()
+    dm.db.disconnect()
+    from_ym = args.from_ym or first_ym
+    to_ym = args.to_ym or latest_ym
+    if not first_ym <= from_ym <= to_ym <= latest_ym:
+        sys.exit(f"Invalid range. Try between {first_ym} & {latest_ym}")
+
+    year_months = DateUtils().get_year_months_range(from_ym, to_ym)
+    if not BatchReport(args.db, args.trace).generate_reports(
+        year_months, args.workers
+    ):
+        sys.exit(1)
+
+
+def load_facts(args: argparse.Namespace) -> None:
+    dm = DataManager(args.db)
+    loader = BulkLoader(dm.db.db_path, args.defer_indexes)
+    files = [(loader.load_sales, path) for path in args.load_sales or []] + [
+        (loader.load_expenses, path) for path in args.load_expenses or []
+    ]
+    for load, path in files:
+        start = time.perf_counter()
+        try:
+            rows_by_month = load(path)
+        except (IngestionError, OSError, sqlite3.Error) as e:
+            sys.exit(f"Failed to load {path}, nothing was loaded from it:\n{e}")
+        months = list(rows_by_month)
+        print(
+            f"Loaded {sum(rows_by_month.values()):,} rows from {path} in "
+            f"{time.perf_counter() - start:.2f}s"
+            + (f", from {months[0]} to {months[-1]}." if months else ".")
+        )
+
+
+def export_kpis(args: argparse.Namespace) -> None:
+    from src.kpi_engine import KpiEngine
+
+    start = time.perf_counter()
+    try:
+        months = KpiEngine(args.db).export(
+            args.export_kpis, args.from_ym, args.to_ym
+        )
+    except (ValueError, ImportError, OSError) as e:
+        sys.exit(f"Failed to export the KPIs:\n{e}")
+    print(
+        f"Exported the KPIs of {months} months into {args.export_kpis} in "
+        f"{time.perf_counter() - start:.2f}s."
+    )
 
 
 def main() -> None:
-    BusinessAutoReport().generate_report()
+    args = parse_args()
+    if args.list_months:
+        dm = DataManager(args.db)
+        first_ym = dm.get_first_db_year_month()
+        latest_ym = dm.get_latest_db_year_month()
+        print(f"{first_ym} {latest_ym}")
+    elif args.warm_cache:
+        from src.charts import warm_caches
+
+        warm_caches()
+        print("Caches are warm.")
+    elif args.check_query_plans:
+        try:
+            DataManager(args.db).check_query_plans(args.check_query_plans)
+        except FullScanError as e:
+            sys.exit(f"Full scan found:\n{e}")
+        print("All report queries use indexes.")
+    elif args.rebuild_rollups:
+        dm = DataManager(args.db)
+        Rollups(dm.db.db_path).rebuild_months(args.rebuild_rollups)
+        print(f"Rebuilt rollups for {', '.join(args.rebuild_rollups)}.")
+    elif args.export_snapshot:
+        from src.snapshot import Snapshot
+
+        dm = DataManager(args.db)
+        snapshot = Snapshot()
+        year_months = snapshot.export(dm.db)
+        print(
+            f"Exported {len(year_months)} changed months "
+            f"into {snapshot.snapshot_dir}."
+        )
+    elif args.load_sales or args.load_expenses:
+        load_facts(args)
+    elif args.serve:
+        from src.report_service import ReportService, serve
+
+        serve(
+            ReportService(args.db, args.workers),
+            port=args.port,
+            socket_path=args.socket,
+        )
+    elif args.update:
+        if not BatchReport(args.db, args.trace).update_reports(args.workers):
+            sys.exit(1)
+    elif args.export_kpis:
+        export_kpis(args)
+    elif args.from_ym or args.to_ym:
+        generate_batch(args)
+    else:
+        BusinessAutoReport(args.db, trace_dir=args.trace).generate_report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+-- Version of each month's facts, bumped by every write to one of its rows
+CREATE TABLE IF NOT EXISTS month_versions (
+    year_month TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- Months with updated or deleted fact rows, rebuilt on the next refresh
+CREATE TABLE IF NOT EXISTS stale_rollup_months (
+    year_month TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
+-- Months already in the database start at version 1
+INSERT OR IGNORE INTO month_versions (year_month, version)
+    SELECT DISTINCT strftime('%Y-%m', date), 1 FROM sales_fact
+    UNION
+    SELECT DISTINCT strftime('%Y-%m', date), 1 FROM expenses_fact;
+
+CREATE TRIGGER IF NOT EXISTS sales_fact_insert_tracking
+AFTER INSERT ON sales_fact
+BEGIN
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', NEW.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sales_fact_update_tracking
+AFTER UPDATE OF date, product_id, quantity ON sales_fact
+BEGIN
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', OLD.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', NEW.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+    INSERT OR IGNORE INTO stale_rollup_months
+        VALUES (strftime('%Y-%m', OLD.date)), (strftime('%Y-%m', NEW.date));
+END;
+
+CREATE TRIGGER IF NOT EXISTS sales_fact_delete_tracking
+AFTER DELETE ON sales_fact
+BEGIN
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', OLD.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+    INSERT OR IGNORE INTO stale_rollup_months
+        VALUES (strftime('%Y-%m', OLD.date));
+END;
+
+CREATE TRIGGER IF NOT EXISTS expenses_fact_insert_tracking
+AFTER INSERT ON expenses_fact
+BEGIN
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', NEW.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS expenses_fact_update_tracking
+AFTER UPDATE OF date, category_id, amount ON expenses_fact
+BEGIN
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', OLD.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', NEW.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+    INSERT OR IGNORE INTO stale_rollup_months
+        VALUES (strftime('%Y-%m', OLD.date)), (strftime('%Y-%m', NEW.date));
+END;
+
+CREATE TRIGGER IF NOT EXISTS expenses_fact_delete_tracking
+AFTER DELETE ON expenses_fact
+BEGIN
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', OLD.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+    INSERT OR IGNORE INTO stale_rollup_months
+        VALUES (strftime('%Y-%m', OLD.date));
+END;
@@ -0,0 +1,34 @@
+-- Calendar dimension, so fact queries join on dates instead of parsing them
+-- row by row. The fiscal year starts in January, like the reports' YTD.
+CREATE TABLE IF NOT EXISTS date_dim (
+    date DATE PRIMARY KEY,  -- Same affinity as the facts, to join on it
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    year_month TEXT NOT NULL,
+    days_in_month INTEGER NOT NULL,
+    day_of_week INTEGER NOT NULL,  -- 0 is Sunday
+    quarter INTEGER NOT NULL,
+    fiscal_year INTEGER NOT NULL,
+    fiscal_quarter INTEGER NOT NULL
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO date_dim
+    WITH RECURSIVE days(date) AS (
+        SELECT '1970-01-01'
+        UNION ALL
+        SELECT date(date, '+1 day') FROM days WHERE date < '2099-12-31'
+    )
+    SELECT
+        date,
+        CAST(substr(date, 1, 4) AS INTEGER),
+        CAST(substr(date, 6, 2) AS INTEGER),
+        CAST(substr(date, 9, 2) AS INTEGER),
+        substr(date, 1, 7),
+        CAST(strftime('%d', date, 'start of month', '+1 month', '-1 day') AS INTEGER),
+        CAST(strftime('%w', date) AS INTEGER),
+        (CAST(substr(date, 6, 2) AS INTEGER) + 2) / 3,
+        CAST(substr(date, 1, 4) AS INTEGER),
+        (CAST(substr(date, 6, 2) AS INTEGER) + 2) / 3
+    FROM
+        days;
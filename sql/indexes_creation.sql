@@ -0,0 +1,13 @@
+-- Covering indexes for date-range reads of the fact tables
+CREATE INDEX IF NOT EXISTS sales_fact_date_idx
+    ON sales_fact (date, product_id, quantity);
+
+CREATE INDEX IF NOT EXISTS expenses_fact_date_idx
+    ON expenses_fact (date, category_id, amount);
+
+-- Lookups of a single product or category over time
+CREATE INDEX IF NOT EXISTS sales_fact_product_idx
+    ON sales_fact (product_id, date);
+
+CREATE INDEX IF NOT EXISTS expenses_fact_category_idx
+    ON expenses_fact (category_id, date);
@@ -0,0 +1,30 @@
+-- The fact ids aren't AUTOINCREMENT, so SQLite gives the id of a deleted
+-- newest row to the next insert. Such a row is at or below the rollups'
+-- last folded id and would never be folded in, so its month is rebuilt.
+DROP TRIGGER IF EXISTS sales_fact_insert_tracking;
+
+CREATE TRIGGER sales_fact_insert_tracking
+AFTER INSERT ON sales_fact
+BEGIN
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', NEW.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+    INSERT OR IGNORE INTO stale_rollup_months
+        SELECT strftime('%Y-%m', NEW.date)
+        FROM rollups_state
+        WHERE fact_table = 'sales_fact' AND NEW.sale_id <= last_row_id;
+END;
+
+DROP TRIGGER IF EXISTS expenses_fact_insert_tracking;
+
+CREATE TRIGGER expenses_fact_insert_tracking
+AFTER INSERT ON expenses_fact
+BEGIN
+    INSERT INTO month_versions (year_month, version)
+        VALUES (strftime('%Y-%m', NEW.date), 1)
+        ON CONFLICT (year_month) DO UPDATE SET version = version + 1;
+    INSERT OR IGNORE INTO stale_rollup_months
+        SELECT strftime('%Y-%m', NEW.date)
+        FROM rollups_state
+        WHERE fact_table = 'expenses_fact' AND NEW.expense_id <= last_row_id;
+END;
@@ -0,0 +1,23 @@
+-- Monthly sales rollup, one row per product per month
+CREATE TABLE IF NOT EXISTS monthly_sales_by_product (
+    year_month TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (year_month, product_id),
+    FOREIGN KEY (product_id) REFERENCES products_dim(product_id)
+) WITHOUT ROWID;
+
+-- Monthly expenses rollup, one row per category per month
+CREATE TABLE IF NOT EXISTS monthly_expenses_by_category (
+    year_month TEXT NOT NULL,
+    category_id INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    PRIMARY KEY (year_month, category_id),
+    FOREIGN KEY (category_id) REFERENCES expenses_categories_dim(category_id)
+) WITHOUT ROWID;
+
+-- Last fact row of each fact table already folded into the rollups
+CREATE TABLE IF NOT EXISTS rollups_state (
+    fact_table TEXT PRIMARY KEY,
+    last_row_id INTEGER NOT NULL
+);
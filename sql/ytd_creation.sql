@@ -0,0 +1,22 @@
+-- Running totals of each year up to each month with sales or expenses,
+-- kept by the rollups refresh, so a YTD value is a primary key lookup
+CREATE TABLE IF NOT EXISTS monthly_ytd (
+    year_month TEXT PRIMARY KEY,
+    ytd_total_sales REAL NOT NULL,
+    ytd_total_expenses REAL NOT NULL,
+    ytd_total_COGS REAL NOT NULL
+) WITHOUT ROWID;
+
+-- Sales are valued at the current unit prices and the COGS found by name,
+-- so changing either clears the totals, rebuilt by the next refresh
+CREATE TRIGGER IF NOT EXISTS products_dim_ytd_tracking
+AFTER UPDATE OF unit_price ON products_dim
+BEGIN
+    DELETE FROM monthly_ytd;
+END;
+
+CREATE TRIGGER IF NOT EXISTS expenses_categories_dim_ytd_tracking
+AFTER UPDATE OF name ON expenses_categories_dim
+BEGIN
+    DELETE FROM monthly_ytd;
+END;
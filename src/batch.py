@@ -0,0 +1,168 @@
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .business_auto_report import BusinessAutoReport
+from .data_manager import DataManager
+from .report_manifest import ReportManifest
+
+if TYPE_CHECKING:
+    from .shared_facts import SharedFacts, SharedFactsHandle
+
+# One report generator per worker process, so its connection is reused
+_worker_report: Optional[BusinessAutoReport] = None
+
+
+class BatchReport:
+    """
+    Generates the reports of a range of months over a process pool.
+    With several workers, the facts are loaded once into shared memory,
+    which the workers read from instead of each querying the database.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        trace_dir: Optional[str] = None,
+        shared_facts: bool = True,
+    ) -> None:
+        self.db_path = db_path
+        self.trace_dir = trace_dir
+        self.shared_facts = shared_facts
+
+    def generate_reports(
+        self, year_months: List[str], workers: Optional[int] = None
+    ) -> bool:
+        """Return True if every report was generated"""
+
+        workers = workers or os.cpu_count() or 1
+        print(f"Generating {len(year_months)} reports with {workers} workers.")
+        manifest = ReportManifest()
+        start = time.perf_counter()
+        facts = self._load_shared_facts(year_months, workers)
+        try:
+            failed = self._run_workers(year_months, workers, manifest, facts)
+        finally:
+            if facts:
+                facts.unlink()
+        manifest.save()
+
+        wall_time = time.perf_counter() - start
+        print(
+            f"{len(year_months) - len(failed)}/{len(year_months)} reports "
+            f"generated in {wall_time:.2f}s "
+            f"({len(year_months) / wall_time:.2f} reports/s)."
+        )
+        if failed:
+            print(f"Failed: {', '.join(sorted(failed))}")
+        return not failed
+
+    def _load_shared_facts(
+        self, year_months: List[str], workers: int
+    ) -> Optional["SharedFacts"]:
+        dm = DataManager(self.db_path)
+        try:
+            # The snapshot's memory maps are already shared between processes
+            if not self.shared_facts or workers <= 1 or dm.snapshot:
+                return None
+            from .shared_facts import SharedFacts
+
+            end = dm.date_utils.get_next_year_month(max(year_months))
+            return SharedFacts.create(dm.db, end)
+        finally:
+            dm.db.disconnect()
+
+    def _run_workers(
+        self,
+        year_months: List[str],
+        workers: int,
+        manifest: ReportManifest,
+        facts: Optional["SharedFacts"],
+    ) -> List[str]:
+        """Return the year-months whose report failed"""
+
+        failed = []
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(
+                self.db_path,
+                self.trace_dir,
+                facts.handle if facts else None,
+            ),
+        ) as executor:
+            futures = {
+                executor.submit(_build_report, year_month): year_month
+                for year_month in year_months
+            }
+            for future in as_completed(futures):
+                year_month = futures[future]
+                error, duration, versions = future.result()
+                if error:
+                    failed.append(year_month)
+                    print(
+                        f"{year_month}: failed after {duration:.2f}s\n{error}"
+                    )
+                else:
+                    manifest.record(year_month, versions)
+                    print(f"{year_month}: done in {duration:.2f}s")
+        return failed
+
+    def update_reports(self, workers: Optional[int] = None) -> bool:
+        """
+        Regenerate the reports built from months whose data changed since,
+        including the ones that only use them for the homologous, YTD or
+        12 months comparisons. Return True if every report was generated.
+        """
+
+        # Refreshing the rollups also rebuilds the months edited since
+        dm = DataManager(self.db_path)
+        manifest = ReportManifest()
+        stale_year_months = [
+            year_month
+            for year_month in manifest.get_report_year_months()
+            if manifest.is_stale(year_month, dm.get_report_versions(year_month))
+        ]
+        dm.db.disconnect()
+        if not stale_year_months:
+            print("Every report is up to date.")
+            return True
+        print(f"Stale reports: {', '.join(stale_year_months)}")
+        return self.generate_reports(stale_year_months, workers)
+
+
+def _init_worker(
+    db_path: Optional[str],
+    trace_dir: Optional[str],
+    facts_handle: Optional["SharedFactsHandle"],
+) -> None:
+    global _worker_report
+    # Months already run in parallel, so each renders its charts serially
+    _worker_report = BusinessAutoReport(
+        db_path, chart_workers=1, trace_dir=trace_dir
+    )
+    if facts_handle:
+        from .shared_facts import SharedFacts
+
+        _worker_report.dm.shared_facts = SharedFacts.attach(facts_handle)
+
+
+def _build_report(
+    year_month: str,
+) -> Tuple[Optional[str], float, Dict[str, int]]:
+    """
+    Return the error traceback, if any, the duration and the data versions
+    the report was built from, read first so changes made meanwhile aren't
+    mistaken for included
+    """
+
+    start = time.perf_counter()
+    versions = {}
+    try:
+        versions = _worker_report.dm.get_report_versions(year_month)
+        _worker_report.build_report(year_month, show_progress=False)
+    except Exception:
+        return traceback.format_exc(), time.perf_counter() - start, versions
+    return None, time.perf_counter() - start, versions
@@ -1,32 +1,122 @@
+import os
 import platform
 import subprocess
-from typing import Callable, List, Optional, Tuple
+import threading
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from tqdm import tqdm
-
-from .charts import Charts
+from . import config, tracing
 from .data_manager import DataManager
-from .pdf_report import PDFReport
+from .report_manifest import ReportManifest
+from .scheduler import Step, StepScheduler
+
+if TYPE_CHECKING:  # Imported on first use, they pull the scientific stack
+    import pandas as pd
+
+    from .charts import Charts
+    from .pdf_report import PDFReport
+    from .report_dataset import ReportDataset
+
+
+# Data the text sections are written from and their PDFReport methods
+TEXT_SECTIONS = [
+    ("month_overview", "add_month_overview"),
+    ("homologous_performance", "add_homologous_performance"),
+    ("in_chain_performance", "add_in_chain_performance"),
+]
+
+# Chart methods and the DataFrames they're drawn from, in page order
+CHART_PAGES = [
+    ("get_homologous_daily_sales_chart", "homologous_df"),
+    ("get_homologous_daily_expenses_chart", "homologous_df"),
+    ("get_homologous_daily_ebt_chart", "homologous_df"),
+    ("get_12_months_daily_sales_chart", "12_months_df"),
+    ("get_12_months_daily_expenses_chart", "12_months_df"),
+    ("get_12_months_daily_ebt_chart", "12_months_df"),
+    ("get_homologous_ytd_gross_chart", "homologous_ytd_gross_df"),
+    ("get_homologous_ytd_chart", "homologous_ytd_df"),
+    ("get_total_sales_by_product_chart", "total_sales_by_product_df"),
+    ("get_total_expenses_by_category_chart", "total_expenses_by_category_df"),
+]
 
 
 class BusinessAutoReport:
-    def __init__(self) -> None:
-        self.ch = Charts()
-        self.dm = DataManager()
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        chart_workers: Optional[int] = None,
+        trace_dir: Optional[str] = None,
+    ) -> None:
+        self.chart_workers = chart_workers
+        # Each report run writes its trace there, None disables tracing
+        self.trace_dir = trace_dir or config.TRACE_DIR
+        self._ch: Optional["Charts"] = None
+        self.dm = DataManager(db_path)
+        # Long-lived, so its threads keep their database connections
+        self.scheduler = StepScheduler()
 
-    def generate_report(self, year_month: Optional[str] = None) -> None:
-        year_month = year_month or self._choose_year_month()
-        pdf_rep = PDFReport(year_month)
-        gen_steps = self._get_generation_steps(year_month, pdf_rep)
+    @property
+    def ch(self) -> "Charts":
+        if self._ch is None:
+            from .charts import Charts
+
+            self._ch = Charts(self.chart_workers)
+        return self._ch
+
+    @ch.setter
+    def ch(self, charts: "Charts") -> None:
+        self._ch = charts
 
+    def generate_report(self, year_month: Optional[str] = None) -> None:
+        if not year_month:
+            # Import the heavy modules while the user is typing
+            threading.Thread(target=import_report_modules, daemon=True).start()
+            year_month = self._choose_year_month()
         print(f"Generating report for {year_month}.")
-        self._execute_generation_steps(gen_steps)
+        versions = self.dm.get_report_versions(year_month)
+        pdf_path = self.build_report(year_month)
+        manifest = ReportManifest()
+        manifest.record(year_month, versions)
+        manifest.save()
         print(f"Report for {year_month} is complete.")
 
         prompt = "Do you want to open the report? [Y/n] "
         if input(prompt) in ("", "Y", "y"):
             print("Opening the report.")
-            self._open_pdf(pdf_rep.pdf_path)
+            self._open_pdf(pdf_path)
+
+    def build_report(self, year_month: str, show_progress: bool = True) -> str:
+        """Generate the report without any prompt and return its path"""
+
+        from .pdf_report import PDFReport
+
+        pdf_rep = PDFReport(year_month)
+        pdf = self._build_pdf(year_month, pdf_rep, show_progress)
+        pdf_rep.save_report(pdf)
+        return pdf_rep.pdf_path
+
+    def build_report_bytes(
+        self, year_month: str, show_progress: bool = False
+    ) -> bytes:
+        """Generate the report in memory, without writing it to disk"""
+
+        from .pdf_report import PDFReport
+
+        pdf_rep = PDFReport(year_month)
+        return self._build_pdf(year_month, pdf_rep, show_progress)
+
+    def _build_pdf(
+        self, year_month: str, pdf_rep: "PDFReport", show_progress: bool
+    ) -> bytes:
+        if self.trace_dir:
+            tracing.start()
+        try:
+            steps = self._get_generation_steps(year_month, pdf_rep)
+            return self._execute_generation_steps(steps, show_progress)
+        finally:
+            if self.trace_dir:
+                self._save_trace(year_month, tracing.stop())
 
     def _choose_year_month(self) -> str:
         first_ym = self.dm.get_first_db_year_month()
@@ -46,106 +136,106 @@ class BusinessAutoReport:
             print(f"Invalid year-month. Try between {first_ym} & {lastest_ym}")
 
     def _get_generation_steps(
-        self, year_month: str, pdf_rep: PDFReport
-    ) -> List[Tuple[str, Callable]]:
-        return [
-            (
-                "Adding month overview",
-                lambda: pdf_rep.add_month_overview(
-                    self.dm.get_month_overview(year_month)
-                ),
-            ),
-            (
-                "Adding homologous performance",
-                lambda: pdf_rep.add_homologous_performance(
-                    self.dm.get_homologous_performance(year_month)
-                ),
-            ),
-            (
-                "Adding in-chain performance",
-                lambda: pdf_rep.add_in_chain_performance(
-                    self.dm.get_in_chain_performance(year_month)
-                ),
-            ),
-            (
-                "Getting homologous daily sales chart",
-                lambda: self.ch.get_homologous_daily_sales_chart(
-                    self.dm.get_homologous_df(year_month)
-                ),
-            ),
-            (
-                "Getting homologous daily expenses chart",
-                lambda: self.ch.get_homologous_daily_expenses_chart(
-                    self.dm.get_homologous_df(year_month)
-                ),
-            ),
-            (
-                "Getting homologous daily EBT chart",
-                lambda: self.ch.get_homologous_daily_ebt_chart(
-                    self.dm.get_homologous_df(year_month)
-                ),
-            ),
-            (
-                "Getting 12 months daily sales chart",
-                lambda: self.ch.get_12_months_daily_sales_chart(
-                    self.dm.get_12_months_df(year_month)
-                ),
-            ),
-            (
-                "Getting 12 months daily expenses chart",
-                lambda: self.ch.get_12_months_daily_expenses_chart(
-                    self.dm.get_12_months_df(year_month)
-                ),
-            ),
-            (
-                "Getting 12 months daily EBT chart",
-                lambda: self.ch.get_12_months_daily_ebt_chart(
-                    self.dm.get_12_months_df(year_month)
-                ),
-            ),
-            (
-                "Getting homologous YTD gross chart",
-                lambda: self.ch.get_homologous_ytd_gross_chart(
-                    self.dm.get_homologous_ytd_gross_df(year_month)
-                ),
-            ),
-            (
-                "Getting homologous YTD chart",
-                lambda: self.ch.get_homologous_ytd_chart(
-                    self.dm.get_homologous_ytd_df(year_month)
-                ),
-            ),
-            (
-                "Getting total sales by product chart",
-                lambda: self.ch.get_total_sales_by_product_chart(
-                    self.dm.get_total_sales_by_product_df(year_month)
-                ),
+        self, year_month: str, pdf_rep: "PDFReport"
+    ) -> List[Step]:
+        """
+        Graph of the report: the queries are run concurrently, each
+        DataFrame is derived once, however many charts are drawn from it,
+        and the charts render while the text is written
+        """
+
+        steps = [
+            Step(
+                "monthly_df",
+                lambda: self.dm.get_report_monthly_df(year_month),
             ),
-            (
-                "Getting total expenses by category chart",
-                lambda: self.ch.get_total_expenses_by_category_chart(
-                    self.dm.get_total_expenses_by_category_df(year_month)
-                ),
+            Step("sales_df", lambda: self.dm.get_month_sales_df(year_month)),
+            Step(
+                "expenses_df",
+                lambda: self.dm.get_month_expenses_df(year_month),
             ),
-            (
-                "Appending charts into final PDF",
-                lambda: pdf_rep.generate_report(self.charts_paths),
+            Step(
+                "dataset",
+                partial(_get_report_dataset, year_month),
+                ("monthly_df", "sales_df", "expenses_df"),
             ),
         ]
+        dataset_outputs = [name for name, _ in TEXT_SECTIONS] + [
+            df_name for _, df_name in CHART_PAGES
+        ]
+        for name in dict.fromkeys(dataset_outputs):
+            steps.append(
+                Step(
+                    name,
+                    partial(get_dataset_output, name=name),
+                    ("dataset",),
+                )
+            )
+        steps.append(
+            Step(
+                "text_sections",
+                lambda *sections: self._add_text_sections(pdf_rep, sections),
+                tuple(name for name, _ in TEXT_SECTIONS),
+            )
+        )
+        for chart_name, df_name in CHART_PAGES:
+            steps.append(
+                Step(
+                    chart_name,
+                    partial(self.ch.render_chart, chart_name),
+                    (df_name,),
+                )
+            )
+        steps.append(
+            Step(
+                "pdf",
+                lambda _, *charts: pdf_rep.generate_report(list(charts)),
+                ("text_sections",)
+                + tuple(chart_name for chart_name, _ in CHART_PAGES),
+            )
+        )
+        return steps
 
-    def _execute_generation_steps(
-        self, gen_steps: List[Tuple[str, Callable]]
+    def _add_text_sections(
+        self, pdf_rep: "PDFReport", sections: Tuple[Dict[str, float], ...]
     ) -> None:
-        """Increment the progress bar while executing the steps"""
+        """Paragraphs are written in order, whichever was computed first"""
 
-        self.charts_paths = []
-        with tqdm(total=len(gen_steps), desc="Generating Report") as pbar:
-            for description, step_func in gen_steps:
-                pbar.set_description(description)
-                output = step_func()
-                if output:
-                    self.charts_paths.append(output)
-                pbar.update(1)
+        for (_, method_name), section in zip(TEXT_SECTIONS, sections):
+            getattr(pdf_rep, method_name)(section)
+
+    def _execute_generation_steps(
+        self, steps: List[Step], show_progress: bool = True
+    ) -> bytes:
+        """Increment the progress bar as the steps complete"""
+
+        from tqdm import tqdm
+
+        with tqdm(
+            total=len(steps),
+            desc="Generating Report",
+            disable=not show_progress,
+        ) as pbar:
+            outputs = self.scheduler.run(
+                steps,
+                targets=["pdf"],
+                on_step_done=lambda _: pbar.update(1),
+            )
+        return outputs["pdf"]
+
+    def _save_trace(
+        self, year_month: str, tracer: Optional["tracing.Tracer"]
+    ) -> None:
+        if tracer is None:
+            return
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        trace_path = os.path.join(
+            self.trace_dir, f"trace_{year_month}_{timestamp}_{os.getpid()}.json"
+        )
+        tracer.save(
+            trace_path,
+            {"year_month": year_month, "db_path": self.dm.db.db_path},
+        )
 
     def _open_pdf(self, file_path: str) -> None:
         """
@@ -162,3 +252,23 @@ class BusinessAutoReport:
                 subprocess.run(("xdg-open", file_path))
         except Exception as e:
             print(f"An error occurred while opening the PDF: {e}")
+
+
+def _get_report_dataset(
+    year_month: str,
+    df_monthly: "pd.DataFrame",
+    df_sales: "pd.DataFrame",
+    df_expenses: "pd.DataFrame",
+) -> "ReportDataset":
+    from .report_dataset import ReportDataset
+
+    return ReportDataset(year_month, df_monthly, df_sales, df_expenses)
+
+
+def get_dataset_output(dataset: "ReportDataset", name: str) -> Any:
+    return getattr(dataset, f"get_{name}")()
+
+
+def import_report_modules() -> None:
+    from . import charts, pdf_report, report_dataset  # noqa: F401
+    import tqdm  # noqa: F401
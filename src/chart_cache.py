@@ -0,0 +1,95 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+import matplotlib
+import pandas as pd
+import seaborn as sns
+
+from . import config
+
+# Bump whenever the look of any chart changes, to invalidate cached charts
+CHARTS_VERSION = "3"
+
+
+class ChartCache:
+    """
+    On-disk cache of rendered charts, addressed by a hash of the chart's
+    name, its DataFrame, the output profile and the charts style version.
+    The least recently used charts are evicted once the cache grows past
+    its maximum size.
+    """
+
+    def __init__(
+        self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None
+    ) -> None:
+        self.cache_dir = os.path.join(
+            cache_dir or config.CHART_CACHE_DIR, "charts"
+        )
+        self.max_bytes = (
+            config.CHART_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(
+        self, chart_name: str, df: pd.DataFrame, profile: str, dpi: int
+    ) -> str:
+        sha = hashlib.sha256()
+        for part in (
+            CHARTS_VERSION,
+            matplotlib.__version__,
+            sns.__version__,
+            profile,
+            str(dpi),
+            chart_name,
+            repr(list(df.columns)),
+            repr(list(df.dtypes.astype(str))),
+        ):
+            sha.update(part.encode())
+            sha.update(b"\0")
+        sha.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return sha.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached chart, marking it as recently used"""
+
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as f:
+                chart = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return chart
+
+    def put(self, key: str, chart: bytes) -> None:
+        # Write then rename, so concurrent readers never see partial charts
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(chart)
+            os.replace(tmp_path, self._get_path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.chart")
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".chart"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
@@ -1,233 +1,445 @@
-import tempfile
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import matplotlib as mpl
 
-from .date_utils import DateUtils
+# Charts are only saved to buffers, never shown, so skip any GUI backend
+mpl.use("Agg")
+
+import matplotlib.style as mplstyle  # noqa: E402
+import pandas as pd  # noqa: E402
+import seaborn as sns  # noqa: E402
+from matplotlib import font_manager  # noqa: E402
+from matplotlib.axes import Axes  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+from . import config, tracing  # noqa: E402
+from .chart_cache import ChartCache  # noqa: E402
+from .date_utils import DateUtils  # noqa: E402
+
+# Vector PDF charts, raster charts, or raster only for dense charts
+CHART_PROFILES = ("vector", "png", "jpeg", "auto")
+
+# With the auto profile, charts plotting more points than this are rasterized.
+# From benchmarks.chart_profiles: below it the vector PDF is the smaller one,
+# and the report's charts plot under a hundred points each
+AUTO_RASTER_MIN_POINTS = 5000
 
 
 class Charts:
-    def __init__(self) -> None:
+    """
+    Each chart is drawn on its own Figure, under a temporary rc context,
+    so charts can be rendered independently, in any process.
+    Charts are returned as PDF, PNG or JPEG bytes, depending on the profile.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        profile: Optional[str] = None,
+        dpi: Optional[int] = None,
+    ) -> None:
         self.date_utils = DateUtils()
+        self.workers = workers
+        self.profile = profile or config.CHART_PROFILE
+        if self.profile not in CHART_PROFILES:
+            raise ValueError(f"Unknown chart profile: {self.profile}")
+        self.dpi = dpi or config.CHART_DPI
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # rc params are global, so charts render one at a time in this process
+        self._render_lock = threading.Lock()
+        self.cache = ChartCache() if config.CHART_CACHE_MAX_BYTES else None
 
-    def get_homologous_daily_sales_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme()
-        sns.barplot(
-            data=df,
-            x="year_month",
-            y="average_daily_sales",
-            hue="year_month",
-            palette="winter",
-            legend=False,
-        )
-        past_3_months_average = df["average_daily_sales"][:-1].mean()
-        plt.axhline(
-            y=past_3_months_average,
-            color="cyan",
-            label=f"Past 3 months average: € {past_3_months_average:,.2f}",
-        )
-        title = "Month + Previous 3 Homologous Months of Daily Sales Average"
-        self._config_chart_tags(title=title)
-        return self._save_chart()
-
-    def get_homologous_daily_expenses_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme()
-        sns.barplot(
-            data=df,
-            x="year_month",
-            y="average_daily_expenses",
-            hue="year_month",
-            palette="spring",
-            legend=False,
-        )
-        past_3_months_average = df["average_daily_expenses"][:-1].mean()
-        plt.axhline(
-            y=past_3_months_average,
-            color="cyan",
-            label=f"Past 3 months average: € {past_3_months_average:,.2f}",
-        )
-        title = "Month + Previous 3 Homologous Months of Daily Expenses Average"
-        self._config_chart_tags(title=title)
-        return self._save_chart()
-
-    def get_homologous_daily_ebt_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme()
-        sns.barplot(
-            data=df,
-            x="year_month",
-            y="average_daily_EBT",
-            hue="year_month",
-            palette="summer",
-            legend=False,
-        )
-        past_3_months_average = df["average_daily_EBT"][:-1].mean()
-        plt.axhline(
-            y=past_3_months_average,
-            color="cyan",
-            label=f"Past 3 months average: € {past_3_months_average:,.2f}",
-        )
-        title = "Month + Previous 3 Homologous Months of Daily Earnings Before Taxes Average"
-        self._config_chart_tags(title=title)
-        return self._save_chart()
-
-    def get_12_months_daily_sales_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme()
-        sns.barplot(
-            data=df,
-            x="year_month",
-            y="average_daily_sales",
-            hue="year_month",
-            palette="winter",
-            legend=False,
-        )
-        past_11_months_average = df["average_daily_sales"][:-1].mean()
-        plt.axhline(
-            y=past_11_months_average,
-            color="cyan",
-            label=f"Past 11 months average: € {past_11_months_average:,.2f}",
-        )
-        title = "Month + Previous 11 Months of Daily Sales Average"
-        self._config_chart_tags(title=title)
-        return self._save_chart()
-
-    def get_12_months_daily_expenses_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme()
-        sns.barplot(
-            data=df,
-            x="year_month",
-            y="average_daily_expenses",
-            hue="year_month",
-            palette="spring",
-            legend=False,
-        )
-        past_11_months_average = df["average_daily_expenses"][:-1].mean()
-        plt.axhline(
-            y=past_11_months_average,
-            color="cyan",
-            label=f"Past 11 months average: € {past_11_months_average:,.2f}",
-        )
-        title = "Month + Previous 11 Months of Daily Expenses Average"
-        self._config_chart_tags(title=title)
-        return self._save_chart()
-
-    def get_12_months_daily_ebt_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme()
-        sns.barplot(
-            data=df,
-            x="year_month",
-            y="average_daily_EBT",
-            hue="year_month",
-            palette="summer",
-            legend=False,
-        )
-        past_11_months_average = df["average_daily_EBT"][:-1].mean()
-        plt.axhline(
-            y=past_11_months_average,
-            color="cyan",
-            label=f"Past 11 months average: € {past_11_months_average:,.2f}",
-        )
-        title = (
-            "Month + Previous 11 Months of Daily Earnings Before Taxes Average"
-        )
-        self._config_chart_tags(title=title)
-        return self._save_chart()
+    def render_chart(self, chart_name: str, df: pd.DataFrame) -> bytes:
+        """
+        Render a single chart, or reuse it from the cache. It can be called
+        from several threads at once: charts are rendered on the process
+        pool, or one at a time in this process if there is a single worker.
+        """
 
-    def get_homologous_ytd_gross_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme(soft_grid=True)
-        sns.lineplot(
-            data=df, x="year", y="ytd_total_sales", label="YTD Total Sales"
-        )
-        sns.lineplot(
-            data=df, x="year", y="ytd_total_COGS", label="YTD Total COGS"
-        )
-        plt.fill_between(
-            df["year"], df["ytd_total_sales"], color="orange", alpha=0.5
-        )
-        plt.fill_between(
-            df["year"], df["ytd_total_COGS"], color="blue", alpha=0.5
-        )
-        title = (
-            "Homologous YTD of Total Sales and Cost of Sold Goods of All Years"
-        )
-        self._config_chart_tags(title=title, xlabel="Year")
-        return self._save_chart()
+        key, chart = self._get_cached_chart(chart_name, df)
+        if chart:
+            return chart
+        if (self.workers or os.cpu_count() or 1) <= 1:
+            with self._render_lock:
+                chart = _render_chart(chart_name, df, self.profile, self.dpi)
+        else:
+            chart = self._get_rendered_chart(
+                self._submit_chart(chart_name, df, self.workers)
+            )
+        if self.cache:
+            self.cache.put(key, chart)
+        return chart
 
-    def get_homologous_ytd_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme(soft_grid=True)
-        sns.lineplot(
-            data=df, x="year", y="ytd_total_sales", label="YTD Total Sales"
-        )
-        sns.lineplot(
-            data=df,
-            x="year",
-            y="ytd_total_expenses",
-            label="YTD Total Expenses",
-        )
-        plt.fill_between(
-            df["year"], df["ytd_total_sales"], color="orange", alpha=0.5
-        )
-        plt.fill_between(
-            df["year"], df["ytd_total_expenses"], color="blue", alpha=0.5
-        )
-        title = "Homologous YTD of Total Sales and Expenses of All Years"
-        self._config_chart_tags(title=title, xlabel="Year")
-        return self._save_chart()
-
-    def get_total_sales_by_product_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme()
-        sns.barplot(
-            data=df,
-            x="total_sales",
-            y="product",
-            hue="total_sales",
-            palette="Blues",
-            legend=False,
-        )
-        title = "Total Revenue of the Month Decomposed By Product"
-        self._config_chart_tags(
-            title=title, xlabel="Amount", ylabel="Product", legend=False
-        )
-        return self._save_chart()
-
-    def get_total_expenses_by_category_chart(self, df: pd.DataFrame) -> str:
-        self._config_chart_theme()
-        sns.barplot(
-            data=df,
-            x="total_expenses",
-            y="category",
-            hue="total_expenses",
-            palette="Reds",
-            legend=False,
+    def _get_cached_chart(
+        self, chart_name: str, df: pd.DataFrame
+    ) -> Tuple[Optional[str], Optional[bytes]]:
+        """Return the chart's cache key and its cached chart, if any"""
+
+        with tracing.span("chart cache", "chart", chart=chart_name) as span:
+            if not self.cache:
+                return None, None
+            key = self.cache.get_key(chart_name, df, self.profile, self.dpi)
+            cached_chart = self.cache.get(key)
+            span.set(hit=cached_chart is not None)
+        return key, cached_chart
+
+    def _submit_chart(
+        self, chart_name: str, df: pd.DataFrame, workers: Optional[int]
+    ) -> Future:
+        with self._executor_lock:
+            if self.executor is None:
+                # Created from a scheduler thread, and forking a threaded
+                # process can copy locks held by the other threads
+                self.executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+        # The workers trace their own spans and send them back with the chart
+        render_func = (
+            _render_chart_traced if tracing.is_enabled() else _render_chart
         )
-        title = "Total Expenses of the Month Decomposed By Category"
-        self._config_chart_tags(
-            title=title, xlabel="Amount", ylabel="Category", legend=False
+        return self.executor.submit(
+            render_func, chart_name, df, self.profile, self.dpi
         )
-        return self._save_chart()
 
-    def _config_chart_theme(self, soft_grid: bool = False) -> None:
-        plt.figure(figsize=(11, 8.5))
-        rc = {"grid.alpha": 0.2 if soft_grid else 1}
-        sns.set_theme(style="darkgrid", rc=rc)
-        plt.style.use("dark_background")
+    def _get_rendered_chart(self, future: Future) -> bytes:
+        chart = future.result()
+        if isinstance(chart, tuple):
+            chart, events = chart
+            tracing.add_events(events)
+        return chart
+
+    def get_homologous_daily_sales_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme() as (fig, ax):
+            sns.barplot(
+                data=df,
+                x="year_month",
+                y="average_daily_sales",
+                hue="year_month",
+                palette="winter",
+                legend=False,
+                ax=ax,
+            )
+            past_3_months_average = df["average_daily_sales"][:-1].mean()
+            ax.axhline(
+                y=past_3_months_average,
+                color="cyan",
+                label=f"Past 3 months average: € {past_3_months_average:,.2f}",
+            )
+            title = (
+                "Month + Previous 3 Homologous Months of Daily Sales Average"
+            )
+            self._config_chart_tags(ax, title=title)
+            return self._save_chart(fig)
+
+    def get_homologous_daily_expenses_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme() as (fig, ax):
+            sns.barplot(
+                data=df,
+                x="year_month",
+                y="average_daily_expenses",
+                hue="year_month",
+                palette="spring",
+                legend=False,
+                ax=ax,
+            )
+            past_3_months_average = df["average_daily_expenses"][:-1].mean()
+            ax.axhline(
+                y=past_3_months_average,
+                color="cyan",
+                label=f"Past 3 months average: € {past_3_months_average:,.2f}",
+            )
+            title = (
+                "Month + Previous 3 Homologous Months of Daily Expenses Average"
+            )
+            self._config_chart_tags(ax, title=title)
+            return self._save_chart(fig)
+
+    def get_homologous_daily_ebt_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme() as (fig, ax):
+            sns.barplot(
+                data=df,
+                x="year_month",
+                y="average_daily_EBT",
+                hue="year_month",
+                palette="summer",
+                legend=False,
+                ax=ax,
+            )
+            past_3_months_average = df["average_daily_EBT"][:-1].mean()
+            ax.axhline(
+                y=past_3_months_average,
+                color="cyan",
+                label=f"Past 3 months average: € {past_3_months_average:,.2f}",
+            )
+            title = "Month + Previous 3 Homologous Months of Daily Earnings Before Taxes Average"
+            self._config_chart_tags(ax, title=title)
+            return self._save_chart(fig)
+
+    def get_12_months_daily_sales_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme() as (fig, ax):
+            sns.barplot(
+                data=df,
+                x="year_month",
+                y="average_daily_sales",
+                hue="year_month",
+                palette="winter",
+                legend=False,
+                ax=ax,
+            )
+            past_11_months_average = df["average_daily_sales"][:-1].mean()
+            ax.axhline(
+                y=past_11_months_average,
+                color="cyan",
+                label=f"Past 11 months average: € {past_11_months_average:,.2f}",
+            )
+            title = "Month + Previous 11 Months of Daily Sales Average"
+            self._config_chart_tags(ax, title=title)
+            return self._save_chart(fig)
+
+    def get_12_months_daily_expenses_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme() as (fig, ax):
+            sns.barplot(
+                data=df,
+                x="year_month",
+                y="average_daily_expenses",
+                hue="year_month",
+                palette="spring",
+                legend=False,
+                ax=ax,
+            )
+            past_11_months_average = df["average_daily_expenses"][:-1].mean()
+            ax.axhline(
+                y=past_11_months_average,
+                color="cyan",
+                label=f"Past 11 months average: € {past_11_months_average:,.2f}",
+            )
+            title = "Month + Previous 11 Months of Daily Expenses Average"
+            self._config_chart_tags(ax, title=title)
+            return self._save_chart(fig)
+
+    def get_12_months_daily_ebt_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme() as (fig, ax):
+            sns.barplot(
+                data=df,
+                x="year_month",
+                y="average_daily_EBT",
+                hue="year_month",
+                palette="summer",
+                legend=False,
+                ax=ax,
+            )
+            past_11_months_average = df["average_daily_EBT"][:-1].mean()
+            ax.axhline(
+                y=past_11_months_average,
+                color="cyan",
+                label=f"Past 11 months average: € {past_11_months_average:,.2f}",
+            )
+            title = "Month + Previous 11 Months of Daily Earnings Before Taxes Average"
+            self._config_chart_tags(ax, title=title)
+            return self._save_chart(fig)
+
+    def get_homologous_ytd_gross_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme(soft_grid=True) as (fig, ax):
+            sns.lineplot(
+                data=df,
+                x="year",
+                y="ytd_total_sales",
+                label="YTD Total Sales",
+                ax=ax,
+            )
+            sns.lineplot(
+                data=df,
+                x="year",
+                y="ytd_total_COGS",
+                label="YTD Total COGS",
+                ax=ax,
+            )
+            ax.fill_between(
+                df["year"], df["ytd_total_sales"], color="orange", alpha=0.5
+            )
+            ax.fill_between(
+                df["year"], df["ytd_total_COGS"], color="blue", alpha=0.5
+            )
+            title = "Homologous YTD of Total Sales and Cost of Sold Goods of All Years"
+            self._config_chart_tags(ax, title=title, xlabel="Year")
+            return self._save_chart(fig)
+
+    def get_homologous_ytd_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme(soft_grid=True) as (fig, ax):
+            sns.lineplot(
+                data=df,
+                x="year",
+                y="ytd_total_sales",
+                label="YTD Total Sales",
+                ax=ax,
+            )
+            sns.lineplot(
+                data=df,
+                x="year",
+                y="ytd_total_expenses",
+                label="YTD Total Expenses",
+                ax=ax,
+            )
+            ax.fill_between(
+                df["year"], df["ytd_total_sales"], color="orange", alpha=0.5
+            )
+            ax.fill_between(
+                df["year"], df["ytd_total_expenses"], color="blue", alpha=0.5
+            )
+            title = "Homologous YTD of Total Sales and Expenses of All Years"
+            self._config_chart_tags(ax, title=title, xlabel="Year")
+            return self._save_chart(fig)
+
+    def get_total_sales_by_product_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme() as (fig, ax):
+            self._draw_breakdown_bars(ax, df, "total_sales", "product", "Blues")
+            title = "Total Revenue of the Month Decomposed By Product"
+            self._config_chart_tags(
+                ax, title=title, xlabel="Amount", ylabel="Product", legend=False
+            )
+            return self._save_chart(fig)
+
+    def get_total_expenses_by_category_chart(self, df: pd.DataFrame) -> bytes:
+        with self._config_chart_theme() as (fig, ax):
+            self._draw_breakdown_bars(
+                ax, df, "total_expenses", "category", "Reds"
+            )
+            title = "Total Expenses of the Month Decomposed By Category"
+            self._config_chart_tags(
+                ax,
+                title=title,
+                xlabel="Amount",
+                ylabel="Category",
+                legend=False,
+            )
+            return self._save_chart(fig)
+
+    def _draw_breakdown_bars(
+        self, ax: Axes, df: pd.DataFrame, value: str, key: str, cmap: str
+    ) -> None:
+        """
+        One horizontal bar per row, top to bottom, shaded by its value
+        through the colormap. Unlike a hue per value, it's a single bar
+        container, whatever the number of products or categories.
+        """
+
+        values = df[value].astype(float)
+        colors = mpl.colormaps[cmap](mpl.colors.Normalize()(values))
+        positions = range(len(df))
+        ax.barh(positions, values, color=colors)
+        ax.set_yticks(positions, df[key].astype(str))
+        # As seaborn draws categorical axes: first row on top, no grid
+        ax.set_ylim(max(len(df), 1) - 0.5, -0.5)
+        ax.yaxis.grid(False)
+
+    @contextmanager
+    def _config_chart_theme(
+        self, soft_grid: bool = False
+    ) -> Iterator[Tuple[Figure, Axes]]:
+        """Apply the theme only while the chart is drawn and saved"""
+
+        with mpl.rc_context():
+            rc = {"grid.alpha": 0.2 if soft_grid else 1}
+            sns.set_theme(style="darkgrid", rc=rc)
+            mplstyle.use("dark_background")
+            fig = Figure(figsize=(11, 8.5))
+            yield fig, fig.add_subplot()
 
     def _config_chart_tags(
         self,
+        ax: Axes,
         title: str,
         xlabel: str = "Year-Month",
         ylabel: str = "Amount",
         legend: bool = True,
     ) -> None:
-        plt.title(title)
-        plt.xlabel(xlabel)
-        plt.xticks(rotation=45)
-        plt.ylabel(ylabel)
+        ax.set_title(title)
+        ax.set_xlabel(xlabel)
+        ax.tick_params(axis="x", labelrotation=45)
+        ax.set_ylabel(ylabel)
         if legend:
-            plt.legend(title="Legend")
+            ax.legend(title="Legend")
+
+    def _save_chart(self, fig: Figure) -> bytes:
+        buffer = io.BytesIO()
+        chart_format = self._get_chart_format(fig)
+        with tracing.span("save chart", "chart", format=chart_format) as span:
+            if chart_format == "pdf":
+                fig.savefig(
+                    buffer, format="pdf", dpi=300, orientation="landscape"
+                )
+            else:
+                pil_kwargs = (
+                    {"quality": config.CHART_JPEG_QUALITY}
+                    if chart_format == "jpeg"
+                    else None
+                )
+                fig.savefig(
+                    buffer,
+                    format=chart_format,
+                    dpi=self.dpi,
+                    pil_kwargs=pil_kwargs,
+                )
+            span.set(bytes=buffer.tell())
+        return buffer.getvalue()
+
+    def _get_chart_format(self, fig: Figure) -> str:
+        if self.profile == "vector":
+            return "pdf"
+        if self.profile in ("png", "jpeg"):
+            return self.profile
+        points = sum(self._get_num_points(ax) for ax in fig.axes)
+        return "png" if points > AUTO_RASTER_MIN_POINTS else "pdf"
+
+    def _get_num_points(self, ax: Axes) -> int:
+        """Vertices of the paths and markers the axes draw"""
+
+        points = sum(len(patch.get_path().vertices) for patch in ax.patches)
+        points += sum(len(line.get_xydata()) for line in ax.lines)
+        for collection in ax.collections:
+            points += len(collection.get_offsets())
+            points += sum(len(path.vertices) for path in collection.get_paths())
+        return points
+
+
+def _render_chart(
+    chart_name: str, df: pd.DataFrame, profile: str, dpi: int
+) -> bytes:
+    """Module level, so it can be pickled into the worker processes"""
+
+    with tracing.span(chart_name, "chart", profile=profile):
+        return getattr(Charts(profile=profile, dpi=dpi), chart_name)(df)
+
+
+def _render_chart_traced(
+    chart_name: str, df: pd.DataFrame, profile: str, dpi: int
+) -> Tuple[bytes, List["tracing.TraceEvent"]]:
+    """Render the chart in a worker process, returning its trace events"""
+
+    tracing.start()
+    try:
+        chart = _render_chart(chart_name, df, profile, dpi)
+    finally:
+        tracer = tracing.stop()
+    return chart, tracer.events
+
+
+def warm_caches() -> None:
+    """
+    Build matplotlib's font list cache, if missing, and load the fonts the
+    charts use, so the first report doesn't pay for it
+    """
 
-    def _save_chart(self) -> str:
-        ch_path = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False).name
-        plt.savefig(ch_path, format="pdf", dpi=300, orientation="landscape")
-        plt.close()
-        return ch_path
+    font_manager.findfont(font_manager.FontProperties())
+    charts = Charts(profile="vector")
+    with charts._config_chart_theme() as (fig, ax):
+        charts._config_chart_tags(ax, title="Warm up", legend=False)
+        charts._save_chart(fig)
@@ -0,0 +1,35 @@
+import os
+import sys
+
+SCR_PATH = os.path.dirname(sys.argv[0])
+
+# Settings can be overridden through the environment
+DB_PATH = os.environ.get("BAR_DB_PATH", os.path.join(SCR_PATH, "database.db"))
+CHART_CACHE_DIR = os.environ.get(
+    "BAR_CHART_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "business-auto-report"),
+)
+# Least recently used charts are evicted past this size, 0 disables the cache
+CHART_CACHE_MAX_BYTES = int(
+    os.environ.get("BAR_CHART_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+
+# Chart output: "vector", "png", "jpeg", or "auto" to rasterize dense charts
+CHART_PROFILE = os.environ.get("BAR_CHART_PROFILE", "vector")
+# Resolution of the raster charts, and the quality of the JPEG ones
+CHART_DPI = int(os.environ.get("BAR_CHART_DPI", 100))
+CHART_JPEG_QUALITY = int(os.environ.get("BAR_CHART_JPEG_QUALITY", 60))
+
+# Products or categories charted, by amount, in the month's breakdowns, the
+# rest summed into an "Other" bar. 0 keeps them all.
+BREAKDOWN_TOP_N = int(os.environ.get("BAR_BREAKDOWN_TOP_N", 30))
+
+# Directory of the per-report timing and SQL traces, unset disables tracing
+TRACE_DIR = os.environ.get("BAR_TRACE_DIR")
+
+# Backend of the report queries: "sqlite", or "snapshot" for the columnar
+# snapshot of the fact tables, exported with --export-snapshot
+BACKEND = os.environ.get("BAR_BACKEND", "sqlite")
+SNAPSHOT_DIR = os.environ.get(
+    "BAR_SNAPSHOT_DIR", os.path.join(SCR_PATH, "snapshot")
+)
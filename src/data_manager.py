@@ -1,344 +1,402 @@
-import os
-import sqlite3
-import sys
-from typing import Any, Dict
-
-import pandas as pd
+from itertools import chain
+from typing import TYPE_CHECKING, Dict, List, Optional
 
+from . import config
+from .database import Database
 from .date_utils import DateUtils
+from .rollups import Rollups
+from .schema import Schema
 
-SCR_PATH = os.path.dirname(sys.argv[0])
-
-
-class Database:
-    def __init__(self) -> None:
-        self.db_path = os.path.join(SCR_PATH, "database.db")
-
-    def connect(self) -> None:
-        self.conn = sqlite3.connect(self.db_path)
-        self.cursor = self.conn.cursor()
+if TYPE_CHECKING:  # pandas is only imported once a report is built
+    import pandas as pd
 
-    def disconnect(self) -> None:
-        self.conn.close()
+    from .report_dataset import ReportDataset
+    from .shared_facts import SharedFacts
+    from .snapshot import Snapshot
 
-    def fetch_result(self, query: str) -> Any:
-        self.connect()
-        result = self.conn.execute(query).fetchone()
-        self.disconnect()
-        return result
-
-    def fetch_df_from_db(self, query: str) -> pd.DataFrame:
-        self.connect()
-        df = pd.read_sql_query(query, self.conn)
-        self.disconnect()
-        return df
+# Report queries run on SQLite, or on the columnar snapshot of the facts
+BACKENDS = ("sqlite", "snapshot")
 
 
 class DataManager:
-    """Didn't refactor the SQL queries for readability reasons"""
-
-    def __init__(self) -> None:
-        self.db = Database()
+    """
+    Didn't refactor the SQL queries for readability reasons.
+    Queries read from the monthly rollups, which are refreshed on init.
+    """
+
+    def __init__(
+        self, db_path: Optional[str] = None, backend: Optional[str] = None
+    ) -> None:
+        self.db = Database(db_path)
         self.date_utils = DateUtils()
+        Schema(self.db.db_path).migrate()
+        Rollups(self.db.db_path).refresh()
+        backend = backend or config.BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.snapshot: Optional["Snapshot"] = None
+        if backend == "snapshot":
+            from .snapshot import Snapshot
+
+            self.snapshot = Snapshot()
+        # Set by batch workers to build their reports from the parent's
+        # shared memory copy of the facts instead
+        self.shared_facts: Optional["SharedFacts"] = None
+
+    def check_query_plans(self, year_month: str) -> None:
+        """
+        Run every report query for the year-month, raising FullScanError
+        if any of them falls back to a full scan
+        """
+
+        self.db.check_query_plans = True
+        try:
+            self.get_first_db_year_month()
+            self.get_latest_db_year_month()
+            self.get_report_versions(year_month)
+            self.get_report_dataset(year_month)
+        finally:
+            self.db.check_query_plans = False
 
     def get_first_db_year_month(self) -> str:
+        if self.snapshot:
+            return self.snapshot.get_year_months()[0]
         query = """
             SELECT
-                strftime('%Y-%m', MIN(date)) AS year_month
+                MIN(year_month) AS year_month
             FROM
-                sales_fact
+                monthly_sales_by_product
         """
         return self.db.fetch_result(query)[0]
 
     def get_latest_db_year_month(self) -> str:
+        if self.snapshot:
+            return self.snapshot.get_year_months()[-1]
         query = """
             SELECT
-                strftime('%Y-%m', MAX(date)) AS year_month
+                MAX(year_month) AS year_month
             FROM
-                sales_fact
+                monthly_sales_by_product
         """
         return self.db.fetch_result(query)[0]
 
-    def get_month_overview(self, year_month: str) -> Dict[str, float]:
-        sales = self._get_total_sales(year_month)
-        df_expenses = self.get_total_expenses_by_category_df(year_month)
-        cogs = df_expenses[df_expenses["category"] == "COGS"][
-            "total_expenses"
-        ].sum()
-        expenses_except_dep_int = df_expenses[
-            ~df_expenses["category"].isin(["Depreciation", "Interest"])
-        ]["total_expenses"].sum()
-        gross_profit = sales - cogs
-        ebitda = sales - expenses_except_dep_int
-        earnings_before_taxes = sales - df_expenses["total_expenses"].sum()
-        return {
-            "sales": sales,
-            "expenses": df_expenses["total_expenses"].sum(),
-            "gross": gross_profit,
-            "gross_mg": (gross_profit / sales) * 100,
-            "EBITDA": ebitda,
-            "EBITDA_mg": (ebitda / sales) * 100,
-            "EBT": earnings_before_taxes,
-            "EBT_mg": (earnings_before_taxes / sales) * 100,
-        }
-
-    def _get_total_sales(self, year_month: str) -> float:
-        query = f"""
-            SELECT
-                SUM(quantity * unit_price) AS total_sales
-            FROM
-                sales_fact
-            LEFT JOIN
-                products_dim ON sales_fact.product_id = products_dim.product_id
-            WHERE
-                strftime('%Y-%m', date) = '{year_month}'
+    def get_report_dataset(self, year_month: str) -> "ReportDataset":
         """
-        return self.db.fetch_result(query)[0]
-
-    def get_total_expenses_by_category_df(
-        self, year_month: str
-    ) -> pd.DataFrame:
-        query = f"""
-            SELECT
-                SUM(amount) AS total_expenses,
-                name AS category
-            FROM
-                expenses_fact
-            LEFT JOIN
-                expenses_categories_dim ON expenses_fact.category_id = expenses_categories_dim.category_id
-            WHERE
-                strftime('%Y-%m', date) = '{year_month}'
-            GROUP BY
-                category
-            ORDER BY
-                total_expenses DESC
+        Load the monthly KPIs of every month the report needs, in one query
+        over both rollups, and the product and category breakdowns of the
+        year-month itself
         """
-        return self.db.fetch_df_from_db(query)
 
-    def get_homologous_performance(self, year_month: str) -> Dict[str, float]:
-        df = self.get_homologous_df(year_month)
-        return {
-            "sales": self._get_perf_percentage(df, "average_daily_sales"),
-            "expenses": self._get_perf_percentage(df, "average_daily_expenses"),
-            "gross": self._get_perf_percentage(df, "average_daily_gross"),
-            "EBITDA": self._get_perf_percentage(df, "average_daily_EBITDA"),
-            "EBT": self._get_perf_percentage(df, "average_daily_EBT"),
-        }
-
-    def get_homologous_df(self, year_month: str) -> pd.DataFrame:
-        year, month = self.date_utils.decompose_year_month(year_month)
-        df_sales = self._get_homologous_sales_df(year, month)
-        df_expenses = self._get_homologous_expenses_df(year, month)
-        return self._get_daily_averages_df(df_sales, df_expenses)
+        from .report_dataset import ReportDataset
 
-    def _get_homologous_sales_df(self, year: int, month: int) -> pd.DataFrame:
-        query = f"""
-            SELECT
-                strftime('%Y-%m', date) AS year_month,
-                SUM(unit_price * quantity) AS total_sales
-            FROM
-                sales_fact
-            LEFT JOIN
-                products_dim ON sales_fact.product_id = products_dim.product_id
-            WHERE
-                strftime('%Y', date) >= '{year-3}'
-                AND strftime('%Y', date) <= '{year}'
-                AND strftime('%m', date) = '{month:02d}'
-            GROUP BY
-                year_month
-        """
-        return self.db.fetch_df_from_db(query)
+        df_monthly = self.get_report_monthly_df(year_month)
+        df_sales = self.get_month_sales_df(year_month)
+        df_expenses = self.get_month_expenses_df(year_month)
+        return ReportDataset(year_month, df_monthly, df_sales, df_expenses)
+
+    def get_report_versions(self, year_month: str) -> Dict[str, int]:
+        """Data version of every month the report is built from"""
 
-    def _get_homologous_expenses_df(
-        self, year: int, month: int
-    ) -> pd.DataFrame:
-        query = f"""
+        params = self._get_report_window(year_month)
+        source = self.shared_facts or self.snapshot
+        if source:
+            return {
+                ym: version
+                for ym, version in source.get_versions().items()
+                if ym < params[0] and (ym[5:] <= params[1] or ym >= params[2])
+            }
+        query = """
             SELECT
-                strftime('%Y-%m', date) AS year_month,
-                SUM(amount) AS total_expenses,
-                SUM(CASE WHEN name = 'COGS' THEN amount ELSE 0 END) AS total_COGS,
-                SUM(CASE WHEN name IN ('Depreciation', 'Interest') THEN amount ELSE 0 END) AS total_dep_int
+                year_month,
+                version
             FROM
-                expenses_fact
-            LEFT JOIN
-                expenses_categories_dim ON expenses_fact.category_id = expenses_categories_dim.category_id
+                month_versions
             WHERE
-                strftime('%Y', date) >= '{year-3}'
-                AND strftime('%Y', date) <= '{year}'
-                AND strftime('%m', date) = '{month:02d}'
-            GROUP BY
-                year_month
+                year_month < ?
+                AND (substr(year_month, 6, 2) <= ? OR year_month >= ?)
         """
-        return self.db.fetch_df_from_db(query)
-
-    def _get_daily_averages_df(
-        self, df_sales: pd.DataFrame, df_expenses: pd.DataFrame
-    ) -> pd.DataFrame:
-        df = pd.merge(df_sales, df_expenses, on="year_month", how="left")
-        df["num_days"] = df["year_month"].apply(
-            lambda x: self.date_utils.get_num_days(x)
-        )
+        return dict(self.db.fetch_all(query, params))
 
-        df["average_daily_sales"] = df["total_sales"] / df["num_days"]
-        df["average_daily_expenses"] = df["total_expenses"] / df["num_days"]
-        df["average_daily_COGS"] = df["total_COGS"] / df["num_days"]
-        df["average_daily_dep_int"] = df["total_dep_int"] / df["num_days"]
+    def get_report_monthly_df(self, year_month: str) -> "pd.DataFrame":
+        """
+        Totals and daily averages of every month of the report's window,
+        with the YTD totals looked up in the maintained monthly_ytd table
+        and the average of the same month of the three previous years
+        computed by a window function
+        """
 
-        df["average_daily_gross"] = (
-            df["average_daily_sales"] - df["average_daily_COGS"]
-        )
-        df["average_daily_EBITDA"] = (
-            df["average_daily_sales"]
-            - df["average_daily_expenses"]
-            + df["average_daily_dep_int"]
-        )
-        df["average_daily_EBT"] = (
-            df["average_daily_sales"] - df["average_daily_expenses"]
-        )
-        return df
+        return self._get_monthly_df(self._get_report_window(year_month))
 
-    def _get_perf_percentage(self, df: pd.DataFrame, column: str) -> float:
-        current = df.iloc[-1][column]
-        previous = df.iloc[:-1][column].mean()
-        return ((current - previous) / previous) * 100
+    def get_history_monthly_df(self) -> "pd.DataFrame":
+        """The same monthly KPIs, of every month in the database"""
 
-    def get_in_chain_performance(self, year_month: str) -> Dict[str, float]:
-        df = self.get_12_months_df(year_month).tail(2).copy()
-        return {
-            "sales": self._get_perf_percentage(df, "average_daily_sales"),
-            "expenses": self._get_perf_percentage(df, "average_daily_expenses"),
-            "gross": self._get_perf_percentage(df, "average_daily_gross"),
-            "EBITDA": self._get_perf_percentage(df, "average_daily_EBITDA"),
-            "EBT": self._get_perf_percentage(df, "average_daily_EBT"),
-        }
-
-    def get_12_months_df(self, year_month: str) -> pd.DataFrame:
-        year, month = self.date_utils.decompose_year_month(year_month)
-        df_sales = self._get_12_months_sales_df(year, month)
-        df_expenses = self._get_12_months_expenses_df(year, month)
-        return self._get_daily_averages_df(df_sales, df_expenses)
+        first_ym = self.get_first_db_year_month()
+        end = self.date_utils.get_next_year_month(
+            self.get_latest_db_year_month()
+        )
+        return self._get_monthly_df([end, "12", first_ym])
 
-    def _get_12_months_sales_df(self, year: int, month: int) -> pd.DataFrame:
-        query = f"""
+    def _get_monthly_df(self, params: List[str]) -> "pd.DataFrame":
+        if self.shared_facts:
+            return self.shared_facts.get_report_monthly_df(params)
+        if self.snapshot:
+            return self.snapshot.get_report_monthly_df(params)
+        query = """
+            WITH monthly_sales AS (
+                SELECT
+                    year_month,
+                    SUM(quantity * unit_price) AS total_sales
+                FROM
+                    monthly_sales_by_product
+                LEFT JOIN
+                    products_dim ON monthly_sales_by_product.product_id = products_dim.product_id
+                WHERE
+                    year_month < ?
+                    AND (substr(year_month, 6, 2) <= ? OR year_month >= ?)
+                GROUP BY
+                    year_month
+            ),
+            monthly_expenses AS (
+                SELECT
+                    year_month,
+                    SUM(amount) AS total_expenses,
+                    SUM(CASE WHEN name = 'COGS' THEN amount ELSE 0 END) AS total_COGS,
+                    SUM(CASE WHEN name IN ('Depreciation', 'Interest') THEN amount ELSE 0 END) AS total_dep_int
+                FROM
+                    monthly_expenses_by_category
+                LEFT JOIN
+                    expenses_categories_dim ON monthly_expenses_by_category.category_id = expenses_categories_dim.category_id
+                WHERE
+                    year_month < ?
+                    AND (substr(year_month, 6, 2) <= ? OR year_month >= ?)
+                GROUP BY
+                    year_month
+            ),
+            monthly AS (
+                SELECT
+                    monthly_sales.year_month,
+                    date_dim.year,
+                    date_dim.month,
+                    total_sales,
+                    total_expenses,
+                    total_COGS,
+                    total_dep_int,
+                    date_dim.days_in_month AS num_days,
+                    total_sales / date_dim.days_in_month AS average_daily_sales,
+                    total_expenses / date_dim.days_in_month AS average_daily_expenses,
+                    total_COGS / date_dim.days_in_month AS average_daily_COGS,
+                    total_dep_int / date_dim.days_in_month AS average_daily_dep_int
+                FROM
+                    monthly_sales
+                LEFT JOIN
+                    monthly_expenses ON monthly_sales.year_month = monthly_expenses.year_month
+                LEFT JOIN
+                    date_dim ON date_dim.date = monthly_sales.year_month || '-01'
+            ),
+            daily AS (
+                SELECT
+                    *,
+                    average_daily_sales - average_daily_COGS AS average_daily_gross,
+                    average_daily_sales - average_daily_expenses + average_daily_dep_int AS average_daily_EBITDA,
+                    average_daily_sales - average_daily_expenses AS average_daily_EBT
+                FROM
+                    monthly
+            )
             SELECT
-                strftime('%Y-%m', date) AS year_month,
-                SUM(unit_price * quantity) AS total_sales
+                daily.*,
+                monthly_ytd.ytd_total_sales,
+                monthly_ytd.ytd_total_expenses,
+                monthly_ytd.ytd_total_COGS,
+                AVG(average_daily_sales) OVER homologous AS homologous_average_daily_sales,
+                AVG(average_daily_expenses) OVER homologous AS homologous_average_daily_expenses,
+                AVG(average_daily_gross) OVER homologous AS homologous_average_daily_gross,
+                AVG(average_daily_EBITDA) OVER homologous AS homologous_average_daily_EBITDA,
+                AVG(average_daily_EBT) OVER homologous AS homologous_average_daily_EBT
             FROM
-                sales_fact
+                daily
             LEFT JOIN
-                products_dim ON sales_fact.product_id = products_dim.product_id
-            WHERE
-                strftime('%Y-%m', date) > '{year-1}-{month:02d}'
-                AND strftime('%Y-%m', date) <= '{year}-{month:02d}'
-            GROUP BY
-                year_month
+                monthly_ytd ON monthly_ytd.year_month = daily.year_month
+            WINDOW
+                homologous AS (
+                    PARTITION BY month ORDER BY year
+                    RANGE BETWEEN 3 PRECEDING AND 1 PRECEDING
+                )
+            ORDER BY
+                daily.year_month
         """
-        return self.db.fetch_df_from_db(query)
+        df = self.db.fetch_df_from_db(query, params * 2)
+        # Columns of only NULLs, like the homologous values of the first
+        # year, come typed as objects
+        return df.astype(
+            {column: float for column in df.columns[df.isna().all()]}
+        )
 
-    def _get_12_months_expenses_df(self, year: int, month: int) -> pd.DataFrame:
-        query = f"""
-            SELECT
-                strftime('%Y-%m', date) AS year_month,
-                SUM(amount) AS total_expenses,
-                SUM(CASE WHEN name = 'COGS' THEN amount ELSE 0 END) AS total_COGS,
-                SUM(CASE WHEN name IN ('Depreciation', 'Interest') THEN amount ELSE 0 END) AS total_dep_int
-            FROM
-                expenses_fact
-            LEFT JOIN
-                expenses_categories_dim ON expenses_fact.category_id = expenses_categories_dim.category_id
-            WHERE
-                strftime('%Y-%m', date) > '{year-1}-{month:02d}'
-                AND strftime('%Y-%m', date) <= '{year}-{month:02d}'
-            GROUP BY
-                year_month
+    def get_month_sales_df(self, year_month: str) -> "pd.DataFrame":
         """
-        return self.db.fetch_df_from_db(query)
-
-    def get_homologous_ytd_gross_df(self, year_month: str) -> pd.DataFrame:
-        year, month = self.date_utils.decompose_year_month(year_month)
-        df_sales = self._get_homologous_ytd_sales_df(year, month)
-        df_cogs = self._get_homologous_ytd_cogs_df(year, month)
-        return pd.merge(df_sales, df_cogs, on="year", how="left")
-
-    def _get_homologous_ytd_sales_df(
-        self, year: int, month: int
-    ) -> pd.DataFrame:
-        query = f"""
-            SELECT
-                strftime('%Y', date) AS year,
-                SUM(unit_price * quantity) AS ytd_total_sales
-            FROM
-                sales_fact
-            LEFT JOIN
-                products_dim ON sales_fact.product_id = products_dim.product_id
-            WHERE
-                strftime('%m', date) <= '{month:02d}'
-                AND strftime('%m', date) >= '01'
-                AND strftime('%Y', date) <= '{year}'
-            GROUP BY
-                year
+        The year-month's products with the most sales, largest first, and
+        the rest summed into a last "Other" row
         """
-        return self.db.fetch_df_from_db(query)
 
-    def _get_homologous_ytd_cogs_df(
-        self, year: int, month: int
-    ) -> pd.DataFrame:
-        query = f"""
+        if self.shared_facts:
+            from .shared_facts import SALES
+
+            df = self.shared_facts.get_month_df(SALES, year_month)
+            return self._get_top_df(df, "product", "total_sales")
+        if self.snapshot:
+            from .snapshot import SALES
+
+            df = self.snapshot.get_month_df(SALES, year_month)
+            return self._get_top_df(df, "product", "total_sales")
+        query = """
+            WITH ranked AS (
+                SELECT
+                    year_month,
+                    name,
+                    quantity * unit_price AS total_sales,
+                    ROW_NUMBER() OVER (
+                        ORDER BY quantity * unit_price DESC, monthly_sales_by_product.product_id
+                    ) AS rank
+                FROM
+                    monthly_sales_by_product
+                LEFT JOIN
+                    products_dim ON monthly_sales_by_product.product_id = products_dim.product_id
+                WHERE
+                    year_month = ?1
+            )
             SELECT
-                strftime('%Y', date) AS year,
-                SUM(amount) AS ytd_total_COGS
+                year_month,
+                CASE WHEN rank <= ?2 OR ?2 = 0 THEN name ELSE 'Other' END AS product,
+                SUM(total_sales) AS total_sales
             FROM
-                expenses_fact
-            LEFT JOIN
-                expenses_categories_dim ON expenses_fact.category_id = expenses_categories_dim.category_id
-            WHERE
-                expenses_categories_dim.name = 'COGS'
-                AND strftime('%m', date) <= '{month:02d}'
-                AND strftime('%m', date) >= '01'
-                AND strftime('%Y', date) <= '{year}'
+                ranked
             GROUP BY
-                year
+                CASE WHEN rank <= ?2 OR ?2 = 0 THEN rank END
+            ORDER BY
+                MIN(rank)
         """
-        return self.db.fetch_df_from_db(query)
+        return self._get_breakdown_df(
+            query, ["year_month", "product", "total_sales"], year_month
+        )
 
-    def get_homologous_ytd_df(self, year_month: str) -> pd.DataFrame:
-        year, month = self.date_utils.decompose_year_month(year_month)
-        df_sales = self._get_homologous_ytd_sales_df(year, month)
-        df_expenses = self._get_homologous_ytd_expenses_df(year, month)
-        return pd.merge(df_sales, df_expenses, on="year", how="left")
-
-    def _get_homologous_ytd_expenses_df(
-        self, year: int, month: int
-    ) -> pd.DataFrame:
-        query = f"""
-            SELECT
-                strftime('%Y', date) AS year,
-                SUM(amount) AS ytd_total_expenses
-            FROM
-                expenses_fact
-            WHERE
-                strftime('%m', date) <= '{month:02d}'
-                AND strftime('%m', date) >= '01'
-                AND strftime('%Y', date) <= '{year}'
-            GROUP BY
-                year
+    def get_month_expenses_df(self, year_month: str) -> "pd.DataFrame":
+        """
+        The year-month's categories with the most expenses, largest first,
+        and the rest summed into a last "Other" row
         """
-        return self.db.fetch_df_from_db(query)
 
-    def get_total_sales_by_product_df(self, year_month: str) -> pd.DataFrame:
-        query = f"""
+        if self.shared_facts:
+            from .shared_facts import EXPENSES
+
+            df = self.shared_facts.get_month_df(EXPENSES, year_month)
+            return self._get_top_df(df, "category", "total_expenses")
+        if self.snapshot:
+            from .snapshot import EXPENSES
+
+            df = self.snapshot.get_month_df(EXPENSES, year_month)
+            return self._get_top_df(df, "category", "total_expenses")
+        query = """
+            WITH ranked AS (
+                SELECT
+                    year_month,
+                    name,
+                    amount AS total_expenses,
+                    ROW_NUMBER() OVER (
+                        ORDER BY amount DESC, monthly_expenses_by_category.category_id
+                    ) AS rank
+                FROM
+                    monthly_expenses_by_category
+                LEFT JOIN
+                    expenses_categories_dim ON monthly_expenses_by_category.category_id = expenses_categories_dim.category_id
+                WHERE
+                    year_month = ?1
+            )
             SELECT
-                SUM(unit_price * quantity) AS total_sales,
-                name AS product
+                year_month,
+                CASE WHEN rank <= ?2 OR ?2 = 0 THEN name ELSE 'Other' END AS category,
+                SUM(total_expenses) AS total_expenses
             FROM
-                sales_fact
-            LEFT JOIN
-                products_dim ON sales_fact.product_id = products_dim.product_id
-            WHERE
-                strftime('%Y-%m', date) = '{year_month}'
+                ranked
             GROUP BY
-                product
+                CASE WHEN rank <= ?2 OR ?2 = 0 THEN rank END
             ORDER BY
-                total_sales DESC
+                MIN(rank)
+        """
+        return self._get_breakdown_df(
+            query, ["year_month", "category", "total_expenses"], year_month
+        )
+
+    def _get_breakdown_df(
+        self, query: str, columns: List[str], year_month: str
+    ) -> "pd.DataFrame":
         """
-        return self.db.fetch_df_from_db(query)
+        The bucketing is done by SQLite, so at most the top rows and the
+        "Other" one are read, in chunks
+        """
+
+        import pandas as pd
+
+        params = [year_month, config.BREAKDOWN_TOP_N]
+        rows = chain.from_iterable(self.db.fetch_chunks(query, params))
+        return pd.DataFrame(list(rows), columns=columns)
+
+    def _get_top_df(
+        self, df: "pd.DataFrame", key: str, value: str
+    ) -> "pd.DataFrame":
+        """The top rows and the "Other" one, as the SQLite queries return"""
+
+        import pandas as pd
+
+        df = df.sort_values(value, ascending=False, kind="stable")
+        top_n = config.BREAKDOWN_TOP_N
+        if not top_n or len(df) <= top_n:
+            return df.reset_index(drop=True)
+        other = pd.DataFrame(
+            {
+                "year_month": [df["year_month"].iloc[0]],
+                key: ["Other"],
+                value: [df[value].iloc[top_n:].sum()],
+            }
+        )
+        return pd.concat([df.head(top_n), other], ignore_index=True)
+
+    def _get_report_window(self, year_month: str) -> List[str]:
+        """
+        Upper bound of the window, last month of the year to include from
+        every year, and start of the 12 months
+        """
+
+        year, month = self.date_utils.decompose_year_month(year_month)
+        end = self.date_utils.get_next_year_month(f"{year}-{month:02d}")
+        start = self.date_utils.get_next_year_month(f"{year - 1}-{month:02d}")
+        return [end, f"{month:02d}", start]
+
+    def get_month_overview(self, year_month: str) -> Dict[str, float]:
+        return self.get_report_dataset(year_month).get_month_overview()
+
+    def get_total_expenses_by_category_df(
+        self, year_month: str
+    ) -> "pd.DataFrame":
+        dataset = self.get_report_dataset(year_month)
+        return dataset.get_total_expenses_by_category_df()
+
+    def get_homologous_performance(self, year_month: str) -> Dict[str, float]:
+        return self.get_report_dataset(year_month).get_homologous_performance()
+
+    def get_homologous_df(self, year_month: str) -> "pd.DataFrame":
+        return self.get_report_dataset(year_month).get_homologous_df()
+
+    def get_in_chain_performance(self, year_month: str) -> Dict[str, float]:
+        return self.get_report_dataset(year_month).get_in_chain_performance()
+
+    def get_12_months_df(self, year_month: str) -> "pd.DataFrame":
+        return self.get_report_dataset(year_month).get_12_months_df()
+
+    def get_homologous_ytd_gross_df(self, year_month: str) -> "pd.DataFrame":
+        return self.get_report_dataset(year_month).get_homologous_ytd_gross_df()
+
+    def get_homologous_ytd_df(self, year_month: str) -> "pd.DataFrame":
+        return self.get_report_dataset(year_month).get_homologous_ytd_df()
+
+    def get_total_sales_by_product_df(self, year_month: str) -> "pd.DataFrame":
+        dataset = self.get_report_dataset(year_month)
+        return dataset.get_total_sales_by_product_df()
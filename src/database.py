@@ -0,0 +1,176 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from . import config, tracing
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Tables that report queries must always reach through an index
+SCAN_CHECKED_TABLES = (
+    "sales_fact",
+    "expenses_fact",
+    "monthly_sales_by_product",
+    "monthly_expenses_by_category",
+    "monthly_ytd",
+)
+
+# Rows held at once by the streaming fetches
+FETCH_CHUNK_ROWS = 10_000
+
+READER_PRAGMAS: Dict[str, Union[int, str]] = {
+    "query_only": "ON",
+    "temp_store": "MEMORY",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # Negative means KiB instead of pages
+}
+
+WRITER_PRAGMAS: Dict[str, Union[int, str]] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -64 * 1024,
+}
+
+
+class FullScanError(Exception):
+    pass
+
+
+def connect_writer(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    apply_pragmas(conn, WRITER_PRAGMAS)
+    return conn
+
+
+def apply_pragmas(
+    conn: sqlite3.Connection, pragmas: Dict[str, Union[int, str]]
+) -> None:
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+class Database:
+    """
+    Read-only access to the database. Each thread gets its own long-lived
+    connection, opened on its first query and reused for the next ones.
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self.db_path = db_path or config.DB_PATH
+        self.check_query_plans = False
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.connect()
+        return conn
+
+    def connect(self) -> sqlite3.Connection:
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        # Only its own thread queries it, but disconnect() may close it from
+        # another, which is safe for a read-only connection
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        apply_pragmas(conn, READER_PRAGMAS)
+        self._local.conn = conn
+        with self._conns_lock:
+            self._conns.append(conn)
+        return conn
+
+    def disconnect(self) -> None:
+        """Close the connections of every thread"""
+
+        with self._conns_lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+        self._local = threading.local()
+
+    def fetch_result(self, query: str, params: Sequence = ()) -> Any:
+        self._check_query_plan(query, params)
+        with tracing.span("fetch_result", "sql", query=query) as span:
+            result = self.conn.execute(query, params).fetchone()
+            span.set(rows=int(result is not None))
+        if span:
+            self._trace_query_plan(span, query, params)
+        return result
+
+    def fetch_all(self, query: str, params: Sequence = ()) -> List[Any]:
+        self._check_query_plan(query, params)
+        with tracing.span("fetch_all", "sql", query=query) as span:
+            result = self.conn.execute(query, params).fetchall()
+            span.set(rows=len(result))
+        if span:
+            self._trace_query_plan(span, query, params)
+        return result
+
+    def fetch_chunks(
+        self,
+        query: str,
+        params: Sequence = (),
+        chunk_rows: int = FETCH_CHUNK_ROWS,
+    ) -> Iterator[List[Any]]:
+        """Stream the rows in lists of up to chunk_rows, read as consumed"""
+
+        self._check_query_plan(query, params)
+        with tracing.span("fetch_chunks", "sql", query=query) as span:
+            cursor = self.conn.execute(query, params)
+            rows = 0
+            while True:
+                chunk = cursor.fetchmany(chunk_rows)
+                if not chunk:
+                    break
+                rows += len(chunk)
+                yield chunk
+            span.set(rows=rows)
+        if span:
+            self._trace_query_plan(span, query, params)
+
+    def fetch_df_from_db(
+        self, query: str, params: Sequence = ()
+    ) -> "pd.DataFrame":
+        import pandas as pd
+
+        self._check_query_plan(query, params)
+        with tracing.span("fetch_df_from_db", "sql", query=query) as span:
+            df = pd.read_sql_query(query, self.conn, params=params)
+            span.set(rows=len(df))
+        if span:
+            self._trace_query_plan(span, query, params)
+        return df
+
+    def get_query_plan(self, query: str, params: Sequence = ()) -> List[str]:
+        plan = self.conn.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        return [row[3] for row in plan.fetchall()]
+
+    def _check_query_plan(self, query: str, params: Sequence) -> None:
+        """Raise if the query scans a whole fact or rollup table"""
+
+        if not self.check_query_plans:
+            return
+        for detail in self.get_query_plan(query, params):
+            words = detail.split()
+            if words[0] == "SCAN" and words[1] in SCAN_CHECKED_TABLES:
+                raise FullScanError(f"{detail}\n{query}")
+
+    def _trace_query_plan(
+        self, span: "tracing.Span", query: str, params: Sequence
+    ) -> None:
+        """Explained after the query, so it isn't part of its timing"""
+
+        span.set(params=list(params), plan=self.get_query_plan(query, params))
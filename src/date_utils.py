@@ -1,30 +1,56 @@
 import calendar
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from typing import Tuple, List
+from typing import TYPE_CHECKING, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 class DateUtils:
+    """
+    Year-months are shifted with integer arithmetic instead of parsing
+    dates, and the day counts of many year-months come as one array
+    """
+
     def decompose_year_month(self, year_month: str) -> Tuple[int, int]:
         year, month = map(int, year_month.split("-"))
         return year, month
 
     def get_previous_year_month(self, year_month: str) -> str:
-        current_ym = datetime.strptime(year_month, "%Y-%m")
-        previous_ym = current_ym - relativedelta(months=1)
-        return previous_ym.strftime("%Y-%m")
+        year, month = self.decompose_year_month(year_month)
+        return f"{year - (month == 1)}-{(month - 2) % 12 + 1:02d}"
 
     def get_next_year_month(self, year_month: str) -> str:
-        current_ym = datetime.strptime(year_month, "%Y-%m")
-        next_ym = current_ym + relativedelta(months=1)
-        return next_ym.strftime("%Y-%m")
+        year, month = self.decompose_year_month(year_month)
+        return f"{year + (month == 12)}-{month % 12 + 1:02d}"
 
     def get_num_days(self, year_month: str) -> int:
         year, month = self.decompose_year_month(year_month)
         return calendar.monthrange(year, month)[1]
 
+    def get_num_days_array(self, year_months: Sequence[str]) -> "np.ndarray":
+        """Number of days of each year-month, computed all at once"""
+
+        import numpy as np
+
+        months = np.asarray(year_months, dtype="datetime64[M]")
+        days = (months + 1).astype("datetime64[D]") - months.astype(
+            "datetime64[D]"
+        )
+        return days.astype(np.int64)
+
     def get_month_name(self, month_num: int) -> str:
         try:
             return calendar.month_name[month_num]
         except (IndexError, KeyError):
             return "Invalid month number..."
+
+    def get_year_months_range(self, first_ym: str, last_ym: str) -> List[str]:
+        first_year, first_month = self.decompose_year_month(first_ym)
+        last_year, last_month = self.decompose_year_month(last_ym)
+        return [
+            f"{index // 12}-{index % 12 + 1:02d}"
+            for index in range(
+                first_year * 12 + first_month - 1,
+                last_year * 12 + last_month,
+            )
+        ]
@@ -0,0 +1,244 @@
+import csv
+import os
+import sqlite3
+from collections import Counter
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+from .database import apply_pragmas, connect_writer
+from .rollups import Rollups
+
+# Rows handed to each executemany call
+BATCH_ROWS = 50_000
+
+# Range of the date_dim calendar, dates outside it are rejected
+MIN_DATE = date(1970, 1, 1)
+MAX_DATE = date(2099, 12, 31)
+
+# On top of the writer pragmas, the whole load runs in one transaction
+LOAD_PRAGMAS = {
+    "cache_size": -512 * 1024,
+    "temp_store": "MEMORY",
+}
+
+
+class FactTable(NamedTuple):
+    name: str
+    dim_table: str
+    dim_id_column: str
+    # Columns of the input file: date, dimension name, then the measure
+    columns: Tuple[str, str, str]
+    insert_query: str
+    measure_type: type
+
+
+SALES = FactTable(
+    "sales_fact",
+    "products_dim",
+    "product_id",
+    ("date", "product", "quantity"),
+    "INSERT INTO sales_fact (date, product_id, quantity) VALUES (?, ?, ?)",
+    int,
+)
+
+EXPENSES = FactTable(
+    "expenses_fact",
+    "expenses_categories_dim",
+    "category_id",
+    ("date", "category", "amount"),
+    "INSERT INTO expenses_fact (date, category_id, amount) VALUES (?, ?, ?)",
+    float,
+)
+
+
+class IngestionError(Exception):
+    pass
+
+
+class BulkLoader:
+    """
+    Streams CSV or Parquet files into the fact tables. Each file loads in a
+    single transaction, so a bad row leaves the database untouched.
+    The change tracking triggers are suspended during the load, and every
+    affected month gets its version bumped once at the end instead.
+    """
+
+    def __init__(self, db_path: str, defer_indexes: bool = False) -> None:
+        self.db_path = db_path
+        # Rebuilding the indexes once beats updating them row by row, but
+        # only when the file is a large share of the table
+        self.defer_indexes = defer_indexes
+
+    def load_sales(self, file_path: str) -> Dict[str, int]:
+        return self._load(SALES, file_path)
+
+    def load_expenses(self, file_path: str) -> Dict[str, int]:
+        return self._load(EXPENSES, file_path)
+
+    def _load(self, fact: FactTable, file_path: str) -> Dict[str, int]:
+        """Return the number of rows loaded into each year-month"""
+
+        conn = connect_writer(self.db_path)
+        try:
+            apply_pragmas(conn, LOAD_PRAGMAS)
+            with conn:
+                # Explicit, so the dropped triggers and indexes roll back too
+                conn.execute("BEGIN IMMEDIATE")
+                ids = self._get_dimension_ids(conn, fact)
+                max_row_id = conn.execute(
+                    f"SELECT MAX(rowid) FROM {fact.name}"
+                ).fetchone()[0]
+                suspended = self._drop_schema_objects(conn, fact, "trigger")
+                if self.defer_indexes:
+                    suspended += self._drop_schema_objects(conn, fact, "index")
+                rows_by_month: Counter = Counter()
+                rows = self._resolve_rows(
+                    fact, self._read_rows(fact, file_path), ids, rows_by_month
+                )
+                while True:
+                    batch = list(islice(rows, BATCH_ROWS))
+                    if not batch:
+                        break
+                    conn.executemany(fact.insert_query, batch)
+                for sql in suspended:
+                    conn.execute(sql)
+                self._flag_reused_ids(conn, fact, max_row_id or 0)
+                conn.executemany(
+                    """
+                    INSERT INTO month_versions (year_month, version)
+                        VALUES (?, 1)
+                        ON CONFLICT (year_month)
+                            DO UPDATE SET version = version + 1
+                    """,
+                    ((year_month,) for year_month in rows_by_month),
+                )
+                # In the load's transaction, so a failure rolls back both.
+                # Only the new rows are aggregated, so only their months change
+                Rollups(self.db_path).fold(conn)
+            conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+        return dict(sorted(rows_by_month.items()))
+
+    def _get_dimension_ids(
+        self, conn: sqlite3.Connection, fact: FactTable
+    ) -> Dict[str, int]:
+        query = f"SELECT name, {fact.dim_id_column} FROM {fact.dim_table}"
+        return dict(conn.execute(query).fetchall())
+
+    def _flag_reused_ids(
+        self, conn: sqlite3.Connection, fact: FactTable, max_row_id: int
+    ) -> None:
+        """
+        With the insert trigger suspended, flag the months of the rows that
+        reused ids already folded into the rollups, as it would
+        """
+
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO stale_rollup_months
+                SELECT DISTINCT strftime('%Y-%m', date)
+                FROM {fact.name}
+                WHERE
+                    rowid > ?
+                    AND rowid <= (
+                        SELECT last_row_id FROM rollups_state
+                        WHERE fact_table = ?
+                    )
+            """,
+            (max_row_id, fact.name),
+        )
+
+    def _drop_schema_objects(
+        self, conn: sqlite3.Connection, fact: FactTable, object_type: str
+    ) -> List[str]:
+        """Drop the table's triggers or indexes, returning their SQL"""
+
+        objects = conn.execute(
+            """
+            SELECT name, sql FROM sqlite_master
+            WHERE type = ? AND tbl_name = ? AND sql IS NOT NULL
+            """,
+            (object_type, fact.name),
+        ).fetchall()
+        for name, _ in objects:
+            conn.execute(f'DROP {object_type.upper()} "{name}"')
+        return [sql for _, sql in objects]
+
+    def _read_rows(self, fact: FactTable, file_path: str) -> Iterator[List]:
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".csv":
+            return self._read_csv_rows(fact, file_path)
+        if extension in (".parquet", ".pq"):
+            return self._read_parquet_rows(fact, file_path)
+        raise IngestionError(f"Unsupported file type: {file_path}")
+
+    def _read_csv_rows(self, fact: FactTable, file_path: str) -> Iterator[List]:
+        with open(file_path, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            indexes = self._get_column_indexes(fact, header, file_path)
+            for row in reader:
+                if len(row) != len(header):
+                    raise IngestionError(
+                        f"Invalid line {reader.line_num}: {len(row)} columns"
+                    )
+                yield [row[index] for index in indexes]
+
+    def _read_parquet_rows(
+        self, fact: FactTable, file_path: str
+    ) -> Iterator[List]:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise IngestionError("Loading Parquet files requires pyarrow")
+
+        parquet_file = pq.ParquetFile(file_path)
+        self._get_column_indexes(fact, parquet_file.schema.names, file_path)
+        for batch in parquet_file.iter_batches(
+            batch_size=BATCH_ROWS, columns=list(fact.columns)
+        ):
+            columns = [column.to_pylist() for column in batch.columns]
+            yield from map(list, zip(*columns))
+
+    def _get_column_indexes(
+        self, fact: FactTable, header: List[str], file_path: str
+    ) -> List[int]:
+        missing = [column for column in fact.columns if column not in header]
+        if missing:
+            raise IngestionError(
+                f"{file_path} is missing the columns: {', '.join(missing)}"
+            )
+        return [header.index(column) for column in fact.columns]
+
+    def _resolve_rows(
+        self,
+        fact: FactTable,
+        rows: Iterator[List],
+        ids: Dict[str, int],
+        rows_by_month: Counter,
+    ) -> Iterator[Tuple[str, int, Any]]:
+        """Validate the rows, swapping names for ids and counting months"""
+
+        for number, (day, name, measure) in enumerate(rows, start=1):
+            try:
+                day = _parse_date(day)
+                dim_id = ids[name]
+                measure = fact.measure_type(measure)
+            except (KeyError, TypeError, ValueError) as e:
+                raise IngestionError(f"Invalid data row {number}: {e!r}")
+            rows_by_month[day[:7]] += 1
+            yield day, dim_id, measure
+
+
+def _parse_date(value: Any) -> str:
+    """Dates are stored as ISO text, Parquet ones come as date objects"""
+
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        value = date.fromisoformat(value)
+    if not MIN_DATE <= value <= MAX_DATE:
+        raise ValueError(f"date {value} not between {MIN_DATE} and {MAX_DATE}")
+    return value.isoformat()
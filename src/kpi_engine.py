@@ -0,0 +1,176 @@
+import json
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .data_manager import DataManager
+from .report_dataset import PERFORMANCE_KPIS
+
+OVERVIEW_KPIS = [
+    "sales",
+    "expenses",
+    "gross",
+    "gross_mg",
+    "EBITDA",
+    "EBITDA_mg",
+    "EBT",
+    "EBT_mg",
+]
+
+# Text sections of the report and their KPIs, as ReportDataset returns them
+KPI_SECTIONS: List[Tuple[str, List[str]]] = [
+    ("month_overview", OVERVIEW_KPIS),
+    ("homologous_performance", PERFORMANCE_KPIS),
+    ("in_chain_performance", PERFORMANCE_KPIS),
+]
+
+# File extensions the KPIs can be exported to
+EXPORT_FORMATS = ("json", "csv", "parquet")
+
+# Year-month, then section, then KPI
+NestedKpis = Dict[str, Dict[str, Dict[str, Optional[float]]]]
+
+
+class KpiEngine:
+    """
+    The KPIs of the report's text sections for a range of months, computed
+    in one vectorized pass over the monthly KPIs of the whole history,
+    without building a dataset, charts or a PDF per month
+    """
+
+    def __init__(self, db_path: Optional[str] = None) -> None:
+        self.dm = DataManager(db_path)
+
+    def get_kpis_df(
+        self, from_ym: Optional[str] = None, to_ym: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        One row per year-month with sales, between the bounds if given,
+        with a "<section>.<kpi>" column per KPI
+        """
+
+        df = get_kpis_df(self.dm.get_history_monthly_df())
+        if from_ym:
+            df = df[df["year_month"] >= from_ym]
+        if to_ym:
+            df = df[df["year_month"] <= to_ym]
+        return df.reset_index(drop=True)
+
+    def get_kpis(
+        self, from_ym: Optional[str] = None, to_ym: Optional[str] = None
+    ) -> NestedKpis:
+        """By year-month, the dicts of the dataset's text sections"""
+
+        return _get_nested_kpis(self.get_kpis_df(from_ym, to_ym))
+
+    def export(
+        self,
+        path: str,
+        from_ym: Optional[str] = None,
+        to_ym: Optional[str] = None,
+    ) -> int:
+        """
+        Write the KPIs in the format of the file's extension, JSON nested
+        like the server's, CSV and Parquet one row per month. Returns the
+        number of months written.
+        """
+
+        file_format = os.path.splitext(path)[1][1:].lower()
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(
+                f"Unknown format of {path}, try {', '.join(EXPORT_FORMATS)}"
+            )
+        df = self.get_kpis_df(from_ym, to_ym)
+        if file_format == "json":
+            with open(path, "w") as file:
+                json.dump(_get_nested_kpis(df), file, indent=2)
+        elif file_format == "csv":
+            df.to_csv(path, index=False)
+        else:
+            df.to_parquet(path, index=False)
+        return len(df)
+
+
+def get_kpis_df(df_monthly: pd.DataFrame) -> pd.DataFrame:
+    """
+    The text section KPIs of every row of the monthly KPIs, ordered by
+    year-month, each column computed at once as ReportDataset does for a
+    single month
+    """
+
+    totals = (
+        df_monthly[
+            ["total_sales", "total_expenses", "total_COGS", "total_dep_int"]
+        ]
+        .astype(float)
+        .fillna(0)
+    )
+    sales, expenses, cogs, dep_int = (totals[column] for column in totals)
+    gross = sales - cogs
+    ebitda = sales - (expenses - dep_int)
+    ebt = sales - expenses
+    overview = {
+        "sales": sales,
+        "expenses": expenses,
+        "gross": gross,
+        "gross_mg": (gross / sales) * 100,
+        "EBITDA": ebitda,
+        "EBITDA_mg": (ebitda / sales) * 100,
+        "EBT": ebt,
+        "EBT_mg": (ebt / sales) * 100,
+    }
+
+    averages = df_monthly[
+        [f"average_daily_{kpi}" for kpi in PERFORMANCE_KPIS]
+    ].astype(float)
+    homologous = df_monthly[
+        [f"homologous_average_daily_{kpi}" for kpi in PERFORMANCE_KPIS]
+    ].astype(float)
+    # The in-chain change is over the previous month with sales, as long
+    # as it's within the report's 12 months
+    month_index = df_monthly["year"] * 12 + df_monthly["month"]
+    previous = averages.shift(1).where(month_index.diff() < 12, axis=0)
+
+    columns = {"year_month": df_monthly["year_month"].astype(str)}
+    for kpi, values in overview.items():
+        columns[f"month_overview.{kpi}"] = values
+    for position, kpi in enumerate(PERFORMANCE_KPIS):
+        current = averages.iloc[:, position]
+        columns[f"homologous_performance.{kpi}"] = _get_change_percentage(
+            current, homologous.iloc[:, position]
+        )
+        columns[f"in_chain_performance.{kpi}"] = _get_change_percentage(
+            current, previous.iloc[:, position]
+        )
+    df = pd.DataFrame(columns)
+    return df[
+        ["year_month"]
+        + [f"{section}.{kpi}" for section, kpis in KPI_SECTIONS for kpi in kpis]
+    ].reset_index(drop=True)
+
+
+def _get_change_percentage(
+    current: pd.Series, previous: pd.Series
+) -> pd.Series:
+    return ((current - previous) / previous) * 100
+
+
+def _get_nested_kpis(df: pd.DataFrame) -> NestedKpis:
+    return {
+        row["year_month"]: {
+            section: {
+                kpi: to_json_number(row[f"{section}.{kpi}"]) for kpi in kpis
+            }
+            for section, kpis in KPI_SECTIONS
+        }
+        for row in df.to_dict("records")
+    }
+
+
+def to_json_number(value: float) -> Optional[float]:
+    """NaN, e.g. a change over zero, isn't valid JSON"""
+
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else value
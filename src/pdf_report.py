@@ -1,6 +1,7 @@
+import io
 import os
 import sys
-import tempfile
+import threading
 from typing import Dict, List
 
 import fitz
@@ -14,16 +15,19 @@ from .date_utils import DateUtils
 
 SCR_PATH = os.path.dirname(sys.argv[0])
 
+# Charts are drawn on 11 x 8.5 inch figures, in points
+CHART_PAGE_SIZE = (11 * 72, 8.5 * 72)
+
+# PyMuPDF isn't thread-safe, reports built concurrently take turns on it
+_FITZ_LOCK = threading.Lock()
+
 
 class PDFReport:
     def __init__(self, year_month: str) -> None:
         self.date_utils = DateUtils()
         filename = f"generated_report_{year_month}.pdf"
         self.pdf_path = os.path.join(SCR_PATH, f"docs/{filename}")
-        self.text_pdf_path = tempfile.NamedTemporaryFile(
-            suffix=".pdf", delete=False
-        ).name
-        self.text_report = TextReport(self.text_pdf_path)
+        self.text_report = TextReport()
         title = self._get_title(year_month)
         self.text_report.add_title(title)
 
@@ -64,33 +68,46 @@ class PDFReport:
         )
         self.text_report.add_paragraph(paragraph)
 
-    def generate_report(self, charts_paths: List[str]) -> None:
+    def generate_report(self, charts: List[bytes]) -> bytes:
+        """Return the final PDF, built in memory"""
+
         paragraph = "Please, take a look at the charts in the next pages."
         self.text_report.add_paragraph(paragraph)
-        self.text_report.generate()
-        self._append_charts_to_report(charts_paths)
+        text_pdf = self.text_report.generate()
+        return self._append_charts_to_report(text_pdf, charts)
+
+    def save_report(self, pdf: bytes) -> None:
+        with open(self.pdf_path, "wb") as f:
+            f.write(pdf)
 
     def _get_title(self, year_month: str) -> str:
         year, month = self.date_utils.decompose_year_month(year_month)
         month_name = self.date_utils.get_month_name(month)
         return f"Report for {month_name} of {year}"
 
-    def _append_charts_to_report(self, charts_paths: List[str]) -> None:
-        text_pdf = fitz.open(self.text_pdf_path)
-        for chart_path in charts_paths:
-            chart_pdf = fitz.open(chart_path)
-            text_pdf.insert_pdf(chart_pdf)
-            chart_pdf.close()
-            os.remove(chart_path)
-        text_pdf.save(self.pdf_path)
-        text_pdf.close()
-        os.remove(self.text_pdf_path)
+    def _append_charts_to_report(
+        self, text_pdf: bytes, charts: List[bytes]
+    ) -> bytes:
+        with _FITZ_LOCK, fitz.open(
+            stream=text_pdf, filetype="pdf"
+        ) as report_pdf:
+            for chart in charts:
+                if chart.startswith(b"%PDF"):
+                    with fitz.open(stream=chart, filetype="pdf") as chart_pdf:
+                        report_pdf.insert_pdf(chart_pdf)
+                else:  # Raster chart, on a page the size of the vector ones
+                    page = report_pdf.new_page(
+                        width=CHART_PAGE_SIZE[0], height=CHART_PAGE_SIZE[1]
+                    )
+                    page.insert_image(page.rect, stream=chart)
+            return report_pdf.tobytes(garbage=3, deflate=True)
 
 
 class TextReport:
-    def __init__(self, text_pdf_path: str) -> None:
+    def __init__(self) -> None:
+        self.buffer = io.BytesIO()
         self.doc = SimpleDocTemplate(
-            text_pdf_path,
+            self.buffer,
             title="Business Report",
             pagesize=letter,
         )
@@ -108,14 +125,19 @@ class TextReport:
         self.flowables.append(paragraph)
         self.flowables.append(Spacer(1, 8))
 
-    def generate(self) -> None:
+    def generate(self) -> bytes:
         self.doc.build(self.flowables)
+        return self.buffer.getvalue()
 
     def _load_carlito_font(self) -> None:
+        """Parsed once per process, the registry is global to ReportLab"""
+
+        if "Carlito" in pdfmetrics.getRegisteredFontNames():
+            return
         carlito_path = "/usr/share/fonts/carlito/Carlito-Regular.ttf"
         carlitob_path = "/usr/share/fonts/carlito/Carlito-Bold.ttf"
-        pdfmetrics.registerFont(TTFont("Carlito", carlito_path))
         pdfmetrics.registerFont(TTFont("Carlito Bold", carlitob_path))
+        pdfmetrics.registerFont(TTFont("Carlito", carlito_path))
 
     def _get_text_styles(self) -> Dict[str, ParagraphStyle]:
         return {
@@ -0,0 +1,251 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .date_utils import DateUtils
+
+# Columns of the monthly DataFrames handed to the charts
+DAILY_AVERAGES_COLUMNS = [
+    "year_month",
+    "total_sales",
+    "total_expenses",
+    "total_COGS",
+    "total_dep_int",
+    "num_days",
+    "average_daily_sales",
+    "average_daily_expenses",
+    "average_daily_COGS",
+    "average_daily_dep_int",
+    "average_daily_gross",
+    "average_daily_EBITDA",
+    "average_daily_EBT",
+]
+
+PERFORMANCE_KPIS = ["sales", "expenses", "gross", "EBITDA", "EBT"]
+
+# Float columns of the monthly KPIs, in the order of the SQLite query
+MONTHLY_KPIS_COLUMNS = (
+    ["total_sales", "total_expenses", "total_COGS", "total_dep_int"]
+    + [
+        f"average_daily_{kpi}"
+        for kpi in ("sales", "expenses", "COGS", "dep_int")
+        + ("gross", "EBITDA", "EBT")
+    ]
+    + ["ytd_total_sales", "ytd_total_expenses", "ytd_total_COGS"]
+    + [f"homologous_average_daily_{kpi}" for kpi in PERFORMANCE_KPIS]
+)
+
+
+class ReportDataset:
+    """
+    Monthly KPIs of every month a report for the year-month needs, with
+    their YTD and homologous window values, and the sales by product and
+    expenses by category of the year-month. All report DataFrames and KPIs
+    are slices of them, without going back to the database.
+    """
+
+    def __init__(
+        self,
+        year_month: str,
+        df_monthly: pd.DataFrame,
+        df_sales: pd.DataFrame,
+        df_expenses: pd.DataFrame,
+    ) -> None:
+        self.date_utils = DateUtils()
+        self.year_month = year_month
+        self.year, self.month = self.date_utils.decompose_year_month(year_month)
+        self.df_monthly = df_monthly.set_index("year_month", drop=False)
+        self.df_sales = df_sales
+        self.df_expenses = df_expenses
+
+    def get_month_overview(self) -> Dict[str, float]:
+        """From the month's totals, the breakdowns only keep the top rows"""
+
+        sales, expenses, cogs, dep_int = (
+            self.df_monthly.loc[
+                self.year_month,
+                [
+                    "total_sales",
+                    "total_expenses",
+                    "total_COGS",
+                    "total_dep_int",
+                ],
+            ]
+            .astype(float)
+            .fillna(0)
+        )
+        gross_profit = sales - cogs
+        ebitda = sales - (expenses - dep_int)
+        earnings_before_taxes = sales - expenses
+        return {
+            "sales": sales,
+            "expenses": expenses,
+            "gross": gross_profit,
+            "gross_mg": (gross_profit / sales) * 100,
+            "EBITDA": ebitda,
+            "EBITDA_mg": (ebitda / sales) * 100,
+            "EBT": earnings_before_taxes,
+            "EBT_mg": (earnings_before_taxes / sales) * 100,
+        }
+
+    def get_total_expenses_by_category_df(self) -> pd.DataFrame:
+        df = self.df_expenses[self.df_expenses["year_month"] == self.year_month]
+        return self._get_month_breakdown_df(df, "total_expenses", "category")
+
+    def get_total_sales_by_product_df(self) -> pd.DataFrame:
+        df = self.df_sales[self.df_sales["year_month"] == self.year_month]
+        return self._get_month_breakdown_df(df, "total_sales", "product")
+
+    def get_homologous_performance(self) -> Dict[str, float]:
+        row = self.df_monthly.loc[self.year_month]
+        return {
+            kpi: self._get_change_percentage(
+                row[f"average_daily_{kpi}"],
+                row[f"homologous_average_daily_{kpi}"],
+            )
+            for kpi in PERFORMANCE_KPIS
+        }
+
+    def get_homologous_df(self) -> pd.DataFrame:
+        year_months = [
+            f"{year}-{self.month:02d}"
+            for year in range(self.year - 3, self.year + 1)
+        ]
+        df = self.df_monthly[self.df_monthly.index.isin(year_months)]
+        return self._get_daily_averages_df(df)
+
+    def get_in_chain_performance(self) -> Dict[str, float]:
+        return self._get_performance(self.get_12_months_df().tail(2))
+
+    def get_12_months_df(self) -> pd.DataFrame:
+        start = self.date_utils.get_next_year_month(
+            f"{self.year - 1}-{self.month:02d}"
+        )
+        df = self.df_monthly[self.df_monthly.index >= start]
+        return self._get_daily_averages_df(df)
+
+    def get_homologous_ytd_gross_df(self) -> pd.DataFrame:
+        return self._get_homologous_ytd_df(["total_sales", "total_COGS"])
+
+    def get_homologous_ytd_df(self) -> pd.DataFrame:
+        return self._get_homologous_ytd_df(["total_sales", "total_expenses"])
+
+    def _get_month_breakdown_df(
+        self, df: pd.DataFrame, value: str, key: str
+    ) -> pd.DataFrame:
+        """Already largest first, with the "Other" row, if any, kept last"""
+
+        return df[[value, key]].reset_index(drop=True)
+
+    def _get_daily_averages_df(self, df_monthly: pd.DataFrame) -> pd.DataFrame:
+        return df_monthly[DAILY_AVERAGES_COLUMNS].reset_index(drop=True)
+
+    def _get_homologous_ytd_df(self, columns: List[str]) -> pd.DataFrame:
+        """
+        The running totals of the last month up to the year-month's one,
+        which is the month itself unless a year has no sales for it
+        """
+
+        df = self.df_monthly[self.df_monthly["month"] <= self.month]
+        ytd_columns = [f"ytd_{column}" for column in columns]
+        df = df[ytd_columns].groupby(df.index.str[:4].rename("year")).last()
+        return df.reset_index()
+
+    def _get_performance(self, df: pd.DataFrame) -> Dict[str, float]:
+        current, previous = df.iloc[-1], df.iloc[:-1].mean(numeric_only=True)
+        return {
+            kpi: self._get_change_percentage(
+                current[f"average_daily_{kpi}"],
+                previous[f"average_daily_{kpi}"],
+            )
+            for kpi in PERFORMANCE_KPIS
+        }
+
+    def _get_change_percentage(self, current: float, previous: float) -> float:
+        return ((current - previous) / previous) * 100
+
+
+def get_monthly_kpis_df(
+    df_sales: pd.DataFrame, df_expenses: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    The monthly KPIs of the SQLite window query, computed by pandas from
+    the monthly totals by product and category, for the other backends.
+    The float columns are filled in place in a single preallocated block.
+    """
+
+    sales = df_sales.groupby("year_month", observed=True)["total_sales"].sum()
+    sales.index = sales.index.astype(str)
+    year_months = sales.index
+    expenses = df_expenses["total_expenses"].to_numpy(dtype=np.float64)
+    category = df_expenses["category"]
+    monthly_expenses = (
+        pd.DataFrame(
+            {
+                "total_expenses": expenses,
+                "total_COGS": np.where(category == "COGS", expenses, 0),
+                "total_dep_int": np.where(
+                    category.isin(["Depreciation", "Interest"]), expenses, 0
+                ),
+            }
+        )
+        .groupby(df_expenses["year_month"].astype(str).to_numpy())
+        .sum()
+    )
+
+    values = np.empty((len(year_months), len(MONTHLY_KPIS_COLUMNS)))
+    totals = values[:, 0:4]
+    averages = values[:, 4:11]
+    ytd = values[:, 11:14]
+    homologous = values[:, 14:19]
+    totals[:, 0] = sales.to_numpy()
+    totals[:, 1:] = monthly_expenses.reindex(year_months).to_numpy()
+    years = np.array([int(ym[:4]) for ym in year_months], dtype=np.int64)
+    months = np.array([int(ym[5:]) for ym in year_months], dtype=np.int64)
+    num_days = DateUtils().get_num_days_array(year_months)
+    np.divide(totals, num_days[:, None], out=averages[:, 0:4])
+    daily_sales, daily_expenses, daily_cogs, daily_dep_int = averages[:, 0:4].T
+    np.subtract(daily_sales, daily_cogs, out=averages[:, 4])
+    np.add(daily_sales - daily_expenses, daily_dep_int, out=averages[:, 5])
+    np.subtract(daily_sales, daily_expenses, out=averages[:, 6])
+
+    # Running totals restarted every year, missing values counted as zero,
+    # over the months with sales or expenses as the monthly_ytd table
+    running_totals = (
+        pd.concat(
+            [sales, monthly_expenses[["total_expenses", "total_COGS"]]], axis=1
+        )
+        .sort_index()
+        .fillna(0)
+    )
+    running_years = np.array(
+        [int(ym[:4]) for ym in running_totals.index], dtype=np.int64
+    )
+    running = running_totals.to_numpy().cumsum(axis=0)
+    before_year = np.vstack([np.zeros((1, 3)), running])
+    running -= before_year[np.searchsorted(running_years, running_years)]
+    ytd[:] = running[running_totals.index.get_indexer(year_months)]
+
+    # Same month of the three previous years, averaged over those present.
+    # Years are rows of a grid, after three empty ones for the first years
+    rows = years - years.min(initial=0) + 3
+    grid = np.full((rows.max(initial=0) + 1, 12, 5), np.nan)
+    grid[rows, months - 1] = averages[:, [0, 1, 4, 5, 6]]
+    previous = np.stack([grid[rows - lag, months - 1] for lag in (1, 2, 3)])
+    present = ~np.isnan(previous)
+    counts = present.sum(axis=0)
+    homologous[:] = np.nan
+    np.divide(
+        np.where(present, previous, 0).sum(axis=0),
+        counts,
+        out=homologous,
+        where=counts > 0,
+    )
+
+    df = pd.DataFrame(values, columns=MONTHLY_KPIS_COLUMNS, copy=False)
+    df.insert(0, "year_month", year_months.to_numpy())
+    df.insert(1, "year", years)
+    df.insert(2, "month", months)
+    df.insert(7, "num_days", num_days)
+    return df
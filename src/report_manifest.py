@@ -0,0 +1,57 @@
+import json
+import os
+import re
+import tempfile
+from typing import Dict, List, Optional
+
+from . import config
+
+DOCS_PATH = os.path.join(config.SCR_PATH, "docs")
+REPORT_FILENAME = re.compile(r"generated_report_(\d{4}-\d{2})\.pdf")
+
+
+class ReportManifest:
+    """
+    Data versions of the months each generated report was built from, so
+    the reports whose window changed since can be told apart from the rest
+    """
+
+    def __init__(self, docs_path: Optional[str] = None) -> None:
+        self.docs_path = docs_path or DOCS_PATH
+        self.manifest_path = os.path.join(self.docs_path, "manifest.json")
+        self.reports: Dict[str, Dict[str, int]] = self._load()
+
+    def record(self, year_month: str, versions: Dict[str, int]) -> None:
+        self.reports[year_month] = versions
+
+    def is_stale(self, year_month: str, versions: Dict[str, int]) -> bool:
+        """Reports built before the manifest existed count as stale"""
+
+        return self.reports.get(year_month) != versions
+
+    def get_report_year_months(self) -> List[str]:
+        """Year-months of the reports generated so far"""
+
+        return sorted(
+            match.group(1)
+            for match in map(
+                REPORT_FILENAME.fullmatch, os.listdir(self.docs_path)
+            )
+            if match
+        )
+
+    def save(self) -> None:
+        # Write then rename, so an interrupted save keeps the previous one
+        fd, tmp_path = tempfile.mkstemp(dir=self.docs_path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.reports, f, indent=2, sort_keys=True)
+        # mkstemp creates the file readable by its owner only
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _load(self) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
@@ -0,0 +1,267 @@
+import json
+import os
+import re
+import signal
+import socketserver
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .business_auto_report import (
+    TEXT_SECTIONS,
+    BusinessAutoReport,
+    get_dataset_output,
+    import_report_modules,
+)
+from .kpi_engine import to_json_number
+from .rollups import Rollups
+
+# Builds queued or running at once, past it requests get a 503
+MAX_PENDING_BUILDS = 8
+# Reports and KPIs kept in memory, by year-month and data version
+CACHE_ENTRIES = 32
+
+ROUTES = {
+    "pdf": re.compile(r"^/reports/(\d{4}-\d{2})\.pdf$"),
+    "kpis": re.compile(r"^/kpis/(\d{4}-\d{2})$"),
+}
+
+# Year-month, then its report versions, as hashable pairs
+BuildKey = Tuple[str, str, Tuple[Tuple[str, int], ...]]
+
+
+class ServiceBusyError(Exception):
+    pass
+
+
+class ReportService:
+    """
+    Builds reports for a long-running server, where the libraries, fonts,
+    database connections and chart cache stay warm between requests.
+    Requests for a report already being built wait for that build instead
+    of starting another, and builds beyond the pending limit are refused
+    so that a burst can't queue unbounded work.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_pending: int = MAX_PENDING_BUILDS,
+    ) -> None:
+        self.bar = BusinessAutoReport(db_path)
+        # Tracing is process-wide, concurrent builds would mix their spans
+        self.bar.trace_dir = None
+        self.executor = ThreadPoolExecutor(
+            workers or os.cpu_count() or 1, thread_name_prefix="report-build"
+        )
+        # Request threads are short-lived, so their queries run on this one
+        # to reuse its database connection
+        self.queries = ThreadPoolExecutor(1, thread_name_prefix="report-query")
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._builds: Dict[BuildKey, Future] = {}
+        self._cache: "OrderedDict[BuildKey, Any]" = OrderedDict()
+        self._rollups_lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        """Import the report modules and load the fonts ahead of requests"""
+
+        from .charts import warm_caches
+        from .pdf_report import TextReport
+
+        import_report_modules()
+        warm_caches()
+        TextReport()
+
+    def get_months(self) -> Dict[str, str]:
+        return self.queries.submit(self._get_months).result()
+
+    def get_pdf(self, year_month: str) -> bytes:
+        return self._get("pdf", year_month, self._build_pdf)
+
+    def get_kpis(self, year_month: str) -> Dict[str, Dict[str, float]]:
+        return self._get("kpis", year_month, self._build_kpis)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.queries.shutdown(wait=True)
+
+    def _get_months(self) -> Dict[str, str]:
+        return {
+            "first": self.bar.dm.get_first_db_year_month(),
+            "latest": self.bar.dm.get_latest_db_year_month(),
+        }
+
+    def _get(
+        self, kind: str, year_month: str, build: Callable[[str], Any]
+    ) -> Any:
+        """
+        Return the cached result if its data is unchanged, else join the
+        running build or start one
+        """
+
+        versions = self.queries.submit(
+            self.bar.dm.get_report_versions, year_month
+        ).result()
+        key = (kind, year_month, tuple(sorted(versions.items())))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            future = self._builds.get(key)
+            if future is None:
+                if not self._pending.acquire(blocking=False):
+                    raise ServiceBusyError("Too many reports being built")
+                future = self.executor.submit(self._run_build, key, build)
+                self._builds[key] = future
+        return future.result()
+
+    def _run_build(self, key: BuildKey, build: Callable[[str], Any]) -> Any:
+        result = None
+        try:
+            result = build(key[1])
+            return result
+        finally:
+            with self._lock:
+                del self._builds[key]
+                if result is not None:
+                    self._cache[key] = result
+                    while len(self._cache) > CACHE_ENTRIES:
+                        self._cache.popitem(last=False)
+            self._pending.release()
+
+    def _build_pdf(self, year_month: str) -> bytes:
+        self._refresh_rollups()
+        return self.bar.build_report_bytes(year_month)
+
+    def _build_kpis(self, year_month: str) -> Dict[str, Dict[str, float]]:
+        self._refresh_rollups()
+        dataset = self.bar.dm.get_report_dataset(year_month)
+        return {
+            name: {
+                kpi: to_json_number(value)
+                for kpi, value in get_dataset_output(dataset, name).items()
+            }
+            for name, _ in TEXT_SECTIONS
+        }
+
+    def _refresh_rollups(self) -> None:
+        """Fold in the facts written since the server started, if any"""
+
+        if self.bar.dm.snapshot:
+            return
+        with self._rollups_lock:
+            Rollups(self.bar.dm.db.db_path).refresh()
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /months, /reports/<year-month>.pdf and /kpis/<year-month>
+    """
+
+    server: "ReportHTTPServer"
+
+    def do_GET(self) -> None:
+        service = self.server.service
+        if self.path == "/months":
+            self._send_json(service.get_months())
+            return
+        for kind, pattern in ROUTES.items():
+            match = pattern.match(self.path)
+            if match:
+                self._send_report(kind, match.group(1))
+                return
+        self.send_error(HTTPStatus.NOT_FOUND)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "local"
+
+    def _send_report(self, kind: str, year_month: str) -> None:
+        service = self.server.service
+        months = service.get_months()
+        if not months["first"] <= year_month <= months["latest"]:
+            self.send_error(
+                HTTPStatus.NOT_FOUND,
+                f"Try between {months['first']} & {months['latest']}",
+            )
+            return
+        try:
+            if kind == "pdf":
+                self._send(service.get_pdf(year_month), "application/pdf")
+            else:
+                self._send_json(service.get_kpis(year_month))
+        except ServiceBusyError as e:
+            self.send_response(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        except Exception as e:
+            self.log_error("Report for %s failed: %r", year_month, e)
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, repr(e))
+
+    def _send_json(self, data: Any) -> None:
+        self._send(json.dumps(data).encode(), "application/json")
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReportHTTPServer(ThreadingHTTPServer):
+    def __init__(
+        self, address: Tuple[str, int], service: ReportService
+    ) -> None:
+        super().__init__(address, ReportRequestHandler)
+        self.service = service
+
+
+class ReportUnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: ReportService) -> None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, ReportRequestHandler)
+        self.service = service
+
+
+def serve(
+    service: ReportService,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Optional[str] = None,
+) -> None:
+    """
+    Serve until interrupted or terminated, on the Unix socket if a path is
+    given
+    """
+
+    service.warm_up()
+    if socket_path:
+        server: socketserver.BaseServer = ReportUnixServer(socket_path, service)
+        print(f"Serving reports on {socket_path}.")
+    else:
+        server = ReportHTTPServer((host, port), service)
+        print(f"Serving reports on http://{host}:{port}.")
+    # shutdown() waits for serve_forever(), so it can't run in its thread
+    signal.signal(
+        signal.SIGTERM,
+        lambda *_: threading.Thread(target=server.shutdown).start(),
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if socket_path:
+            os.remove(socket_path)
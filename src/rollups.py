@@ -0,0 +1,264 @@
+import sqlite3
+from typing import List, Set
+
+from .database import connect_writer
+from .date_utils import DateUtils
+
+
+class Rollups:
+    """
+    Keeps the monthly summary tables in sync with the fact tables.
+    Only fact rows inserted since the last refresh are aggregated, so
+    a refresh touches just the months that received new rows. Months whose
+    fact rows were updated or deleted are flagged by triggers and rebuilt.
+    The YTD running totals are then recomputed for the years of the months
+    touched.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self.date_utils = DateUtils()
+
+    def refresh(self) -> None:
+        conn = connect_writer(self.db_path)
+        try:
+            with conn:
+                self.fold(conn)
+        finally:
+            conn.close()
+
+    def fold(self, conn: sqlite3.Connection) -> None:
+        """Refresh within the caller's transaction, e.g. a bulk load's"""
+
+        year_months = self._refresh_sales(conn)
+        year_months |= self._refresh_expenses(conn)
+        year_months |= self._rebuild_stale_months(conn)
+        self._refresh_ytd(conn, year_months)
+
+    def rebuild_months(self, year_months: List[str]) -> None:
+        """Recompute the months from scratch, e.g. after back-dated edits"""
+
+        conn = connect_writer(self.db_path)
+        try:
+            with conn:
+                new_year_months = self._refresh_sales(conn)
+                new_year_months |= self._refresh_expenses(conn)
+                for year_month in year_months:
+                    self._rebuild_sales_month(conn, year_month)
+                    self._rebuild_expenses_month(conn, year_month)
+                self._refresh_ytd(conn, new_year_months | set(year_months))
+        finally:
+            conn.close()
+
+    def _refresh_sales(self, conn: sqlite3.Connection) -> Set[str]:
+        """Fold in the new rows, returning the months they fall in"""
+
+        last_row_id = self._get_last_row_id(conn, "sales_fact")
+        max_row_id = conn.execute(
+            "SELECT MAX(sale_id) FROM sales_fact"
+        ).fetchone()[0]
+        if max_row_id is None or max_row_id <= last_row_id:
+            return set()
+        query = """
+            INSERT INTO monthly_sales_by_product (year_month, product_id, quantity)
+            SELECT
+                substr(date, 1, 7),
+                product_id,
+                SUM(quantity)
+            FROM
+                sales_fact
+            WHERE
+                sale_id > ? AND sale_id <= ?
+            GROUP BY
+                substr(date, 1, 7), product_id
+            ON CONFLICT (year_month, product_id)
+                DO UPDATE SET quantity = quantity + excluded.quantity
+            RETURNING
+                year_month
+        """
+        rows = conn.execute(query, (last_row_id, max_row_id)).fetchall()
+        self._set_last_row_id(conn, "sales_fact", max_row_id)
+        return {year_month for (year_month,) in rows}
+
+    def _refresh_expenses(self, conn: sqlite3.Connection) -> Set[str]:
+        """Fold in the new rows, returning the months they fall in"""
+
+        last_row_id = self._get_last_row_id(conn, "expenses_fact")
+        max_row_id = conn.execute(
+            "SELECT MAX(expense_id) FROM expenses_fact"
+        ).fetchone()[0]
+        if max_row_id is None or max_row_id <= last_row_id:
+            return set()
+        query = """
+            INSERT INTO monthly_expenses_by_category (year_month, category_id, amount)
+            SELECT
+                substr(date, 1, 7),
+                category_id,
+                SUM(amount)
+            FROM
+                expenses_fact
+            WHERE
+                expense_id > ? AND expense_id <= ?
+            GROUP BY
+                substr(date, 1, 7), category_id
+            ON CONFLICT (year_month, category_id)
+                DO UPDATE SET amount = amount + excluded.amount
+            RETURNING
+                year_month
+        """
+        rows = conn.execute(query, (last_row_id, max_row_id)).fetchall()
+        self._set_last_row_id(conn, "expenses_fact", max_row_id)
+        return {year_month for (year_month,) in rows}
+
+    def _rebuild_stale_months(self, conn: sqlite3.Connection) -> Set[str]:
+        """Rebuilt after the new rows are folded in, so none count twice"""
+
+        stale_months = conn.execute(
+            "SELECT year_month FROM stale_rollup_months"
+        ).fetchall()
+        for (year_month,) in stale_months:
+            self._rebuild_sales_month(conn, year_month)
+            self._rebuild_expenses_month(conn, year_month)
+        conn.execute("DELETE FROM stale_rollup_months")
+        return {year_month for (year_month,) in stale_months}
+
+    def _refresh_ytd(
+        self, conn: sqlite3.Connection, year_months: Set[str]
+    ) -> None:
+        """
+        Recompute the running totals of the years of the months, or of
+        every year once a dimension change cleared them
+        """
+
+        if conn.execute("SELECT 1 FROM monthly_ytd LIMIT 1").fetchone() is None:
+            query = """
+                SELECT year_month FROM monthly_sales_by_product
+                UNION
+                SELECT year_month FROM monthly_expenses_by_category
+            """
+            year_months = {year_month for (year_month,) in conn.execute(query)}
+        for year in sorted({int(year_month[:4]) for year_month in year_months}):
+            self._rebuild_ytd_year(conn, year)
+
+    def _rebuild_ytd_year(self, conn: sqlite3.Connection, year: int) -> None:
+        year_range = [f"{year}-01", f"{year + 1}-01"]
+        conn.execute(
+            "DELETE FROM monthly_ytd WHERE year_month >= ? AND year_month < ?",
+            year_range,
+        )
+        query = """
+            INSERT INTO monthly_ytd (year_month, ytd_total_sales, ytd_total_expenses, ytd_total_COGS)
+            WITH monthly_sales AS (
+                SELECT
+                    year_month,
+                    SUM(quantity * unit_price) AS total_sales
+                FROM
+                    monthly_sales_by_product
+                LEFT JOIN
+                    products_dim ON monthly_sales_by_product.product_id = products_dim.product_id
+                WHERE
+                    year_month >= ?1 AND year_month < ?2
+                GROUP BY
+                    year_month
+            ),
+            monthly_expenses AS (
+                SELECT
+                    year_month,
+                    SUM(amount) AS total_expenses,
+                    SUM(CASE WHEN name = 'COGS' THEN amount ELSE 0 END) AS total_COGS
+                FROM
+                    monthly_expenses_by_category
+                LEFT JOIN
+                    expenses_categories_dim ON monthly_expenses_by_category.category_id = expenses_categories_dim.category_id
+                WHERE
+                    year_month >= ?1 AND year_month < ?2
+                GROUP BY
+                    year_month
+            ),
+            months AS (
+                SELECT year_month FROM monthly_sales
+                UNION
+                SELECT year_month FROM monthly_expenses
+            )
+            SELECT
+                months.year_month,
+                TOTAL(total_sales) OVER running,
+                TOTAL(total_expenses) OVER running,
+                TOTAL(total_COGS) OVER running
+            FROM
+                months
+            LEFT JOIN
+                monthly_sales ON months.year_month = monthly_sales.year_month
+            LEFT JOIN
+                monthly_expenses ON months.year_month = monthly_expenses.year_month
+            WINDOW
+                running AS (ORDER BY months.year_month)
+        """
+        conn.execute(query, year_range)
+
+    def _rebuild_sales_month(
+        self, conn: sqlite3.Connection, year_month: str
+    ) -> None:
+        conn.execute(
+            "DELETE FROM monthly_sales_by_product WHERE year_month = ?",
+            (year_month,),
+        )
+        query = """
+            INSERT INTO monthly_sales_by_product (year_month, product_id, quantity)
+            SELECT
+                ?,
+                product_id,
+                SUM(quantity)
+            FROM
+                sales_fact
+            WHERE
+                date >= ? AND date < ?
+            GROUP BY
+                product_id
+        """
+        conn.execute(query, (year_month, *self._get_date_range(year_month)))
+
+    def _rebuild_expenses_month(
+        self, conn: sqlite3.Connection, year_month: str
+    ) -> None:
+        conn.execute(
+            "DELETE FROM monthly_expenses_by_category WHERE year_month = ?",
+            (year_month,),
+        )
+        query = """
+            INSERT INTO monthly_expenses_by_category (year_month, category_id, amount)
+            SELECT
+                ?,
+                category_id,
+                SUM(amount)
+            FROM
+                expenses_fact
+            WHERE
+                date >= ? AND date < ?
+            GROUP BY
+                category_id
+        """
+        conn.execute(query, (year_month, *self._get_date_range(year_month)))
+
+    def _get_date_range(self, year_month: str) -> List[str]:
+        """Half-open date range covering the whole month"""
+
+        next_year_month = self.date_utils.get_next_year_month(year_month)
+        return [f"{year_month}-01", f"{next_year_month}-01"]
+
+    def _get_last_row_id(
+        self, conn: sqlite3.Connection, fact_table: str
+    ) -> int:
+        row = conn.execute(
+            "SELECT last_row_id FROM rollups_state WHERE fact_table = ?",
+            (fact_table,),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _set_last_row_id(
+        self, conn: sqlite3.Connection, fact_table: str, last_row_id: int
+    ) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO rollups_state VALUES (?, ?)",
+            (fact_table, last_row_id),
+        )
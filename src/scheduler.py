@@ -0,0 +1,137 @@
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from . import tracing
+
+
+class Step(NamedTuple):
+    """
+    A node of the generation graph. Its output is named after the step, and
+    it's called with the outputs of its inputs, in the order they're listed.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+
+
+class StepScheduler:
+    """
+    Runs steps as soon as their inputs are ready, over a thread pool.
+    Each output is computed once, however many steps take it as input.
+    Steps are submitted in the order given, so runs are reproducible.
+    Steps doing CPU-bound work are expected to hand it to processes,
+    like the charts do, since threads only overlap I/O and the C code
+    releasing the GIL (SQLite, pandas, NumPy).
+    """
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.workers = workers
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def run(
+        self,
+        steps: List[Step],
+        targets: Optional[Iterable[str]] = None,
+        on_step_done: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the steps the targets depend on (all if there are no targets)
+        and return the outputs, by step name
+        """
+
+        steps_by_name = self._get_steps_by_name(steps)
+        needed = self._get_needed_steps(
+            steps_by_name, targets or steps_by_name.keys()
+        )
+        ordered_steps = [step for step in steps if step.name in needed]
+        outputs: Dict[str, Any] = {}
+        running: Dict[Future, str] = {}
+        waiting = list(ordered_steps)
+        with self._executor_lock:  # Graphs can be run from several threads
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        while waiting or running:
+            for step in [s for s in waiting if self._is_ready(s, outputs)]:
+                waiting.remove(step)
+                args = [outputs[name] for name in step.inputs]
+                # In the caller's context, so the steps trace into its run
+                future = self.executor.submit(
+                    contextvars.copy_context().run, self._run_step, step, args
+                )
+                running[future] = step.name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outputs[name] = future.result()
+                except BaseException:
+                    self._cancel(running)
+                    raise
+                if on_step_done:
+                    on_step_done(name)
+        return outputs
+
+    def _cancel(self, running: Dict[Future, str]) -> None:
+        """Cancel the queued steps and wait for the started ones"""
+
+        for future in running:
+            future.cancel()
+        wait(running)
+
+    def _run_step(self, step: Step, args: List[Any]) -> Any:
+        with tracing.span(step.name, "step"):
+            return step.func(*args)
+
+    def _is_ready(self, step: Step, outputs: Dict[str, Any]) -> bool:
+        return all(name in outputs for name in step.inputs)
+
+    def _get_steps_by_name(self, steps: List[Step]) -> Dict[str, Step]:
+        steps_by_name: Dict[str, Step] = {}
+        for step in steps:
+            if step.name in steps_by_name:
+                raise ValueError(f"Duplicate step: {step.name}")
+            steps_by_name[step.name] = step
+        for step in steps:
+            for name in step.inputs:
+                if name not in steps_by_name:
+                    raise ValueError(f"Unknown input of {step.name}: {name}")
+        return steps_by_name
+
+    def _get_needed_steps(
+        self, steps_by_name: Dict[str, Step], targets: Iterable[str]
+    ) -> Set[str]:
+        """Return the targets and their transitive inputs, if acyclic"""
+
+        needed: Set[str] = set()
+        visiting: Set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in needed:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through step: {name}")
+            if name not in steps_by_name:
+                raise ValueError(f"Unknown step: {name}")
+            visiting.add(name)
+            for input_name in steps_by_name[name].inputs:
+                visit(input_name)
+            visiting.remove(name)
+            needed.add(name)
+
+        for name in targets:
+            visit(name)
+        return needed
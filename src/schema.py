@@ -0,0 +1,40 @@
+import os
+import sqlite3
+
+from .database import connect_writer
+
+SQL_PATH = os.path.join(os.path.dirname(__file__), "..", "sql")
+
+# Applied in order, the database's user_version counts the ones applied
+MIGRATIONS = [
+    "rollups_creation.sql",
+    "indexes_creation.sql",
+    "change_tracking_creation.sql",
+    "date_dim_creation.sql",
+    "ytd_creation.sql",
+    "reused_ids_tracking.sql",
+]
+
+
+class Schema:
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+
+    def migrate(self) -> None:
+        conn = connect_writer(self.db_path)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for number, filename in enumerate(MIGRATIONS, start=1):
+                if number > version:
+                    self._apply_migration(conn, number, filename)
+        finally:
+            conn.close()
+
+    def _apply_migration(
+        self, conn: sqlite3.Connection, number: int, filename: str
+    ) -> None:
+        with open(os.path.join(SQL_PATH, filename)) as f:
+            script = f.read()
+        conn.executescript(
+            f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;"
+        )
@@ -0,0 +1,322 @@
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .database import Database
+from .date_utils import DateUtils
+
+# Fact rows converted to arrays at a time while loading
+LOAD_BATCH_ROWS = 100_000
+
+
+class SharedFactTable(NamedTuple):
+    fact_table: str
+    dim_table: str
+    dim_id_column: str
+    measure: str
+    measure_dtype: str
+    # Columns of the DataFrame returned, as in the SQLite queries
+    name_alias: str
+    total_column: str
+
+
+SALES = SharedFactTable(
+    "sales_fact",
+    "products_dim",
+    "product_id",
+    "quantity",
+    "int32",
+    "product",
+    "total_sales",
+)
+
+EXPENSES = SharedFactTable(
+    "expenses_fact",
+    "expenses_categories_dim",
+    "category_id",
+    "amount",
+    "float64",
+    "category",
+    "total_expenses",
+)
+
+
+class SharedArray(NamedTuple):
+    shm_name: str
+    dtype: str
+    length: int
+
+
+class SharedTableHandle(NamedTuple):
+    """What a worker needs to attach to a table, small enough to pickle"""
+
+    days: SharedArray
+    codes: SharedArray
+    measures: SharedArray
+    # Dimension names, and unit prices for the sales, indexed by code
+    names: List[str]
+    unit_prices: Optional[List[float]]
+
+
+class SharedFactsHandle(NamedTuple):
+    tables: Dict[str, SharedTableHandle]
+    # Data version of each month, as of the load
+    versions: Dict[str, int]
+
+
+class SharedFacts:
+    """
+    The fact tables as NumPy arrays in shared memory, loaded once by the
+    parent process. Workers attach to them without copying, so memory
+    doesn't grow with the worker count. Rows are sorted by date, stored as
+    int32 day numbers since 1970-01-01, so each month is a slice, and
+    products and categories are stored as codes into their names.
+    """
+
+    def __init__(
+        self,
+        handle: SharedFactsHandle,
+        segments: List[shared_memory.SharedMemory],
+        arrays: Dict[str, Dict[str, np.ndarray]],
+    ) -> None:
+        self.handle = handle
+        self.date_utils = DateUtils()
+        self._segments = segments
+        self._arrays = arrays
+
+    @classmethod
+    def create(cls, db: Database, end: str) -> "SharedFacts":
+        """Load the facts of the year-months before the end one"""
+
+        segments: List[shared_memory.SharedMemory] = []
+        arrays: Dict[str, Dict[str, np.ndarray]] = {}
+        tables: Dict[str, SharedTableHandle] = {}
+        # One read transaction, so the counts match the rows read after
+        # and the versions match the rows
+        db.conn.execute("BEGIN")
+        try:
+            versions = dict(
+                db.fetch_all("SELECT year_month, version FROM month_versions")
+            )
+            for table in (SALES, EXPENSES):
+                tables[table.fact_table], arrays[table.fact_table] = (
+                    cls._load_table(db, table, f"{end}-01", segments)
+                )
+        except BaseException:
+            for segment in segments:
+                segment.close()
+                segment.unlink()
+            raise
+        finally:
+            db.conn.execute("COMMIT")
+        return cls(SharedFactsHandle(tables, versions), segments, arrays)
+
+    @classmethod
+    def attach(cls, handle: SharedFactsHandle) -> "SharedFacts":
+        segments: List[shared_memory.SharedMemory] = []
+        arrays: Dict[str, Dict[str, np.ndarray]] = {}
+        for fact_table, table_handle in handle.tables.items():
+            arrays[fact_table] = {}
+            for column in ("days", "codes", "measures"):
+                shared_array = getattr(table_handle, column)
+                segment = shared_memory.SharedMemory(shared_array.shm_name)
+                segments.append(segment)
+                arrays[fact_table][column] = _get_array(segment, shared_array)
+        return cls(handle, segments, arrays)
+
+    def close(self) -> None:
+        self._arrays.clear()
+        for segment in self._segments:
+            segment.close()
+
+    def unlink(self) -> None:
+        """Free the memory, once every process is done with it"""
+
+        self.close()
+        for segment in self._segments:
+            segment.unlink()
+
+    def get_versions(self) -> Dict[str, int]:
+        return self.handle.versions
+
+    def get_report_monthly_df(self, window: List[str]) -> pd.DataFrame:
+        """
+        Monthly KPIs over the report's window, with the columns of the
+        SQLite window query
+        """
+
+        from .report_dataset import get_monthly_kpis_df
+
+        return get_monthly_kpis_df(
+            self.get_report_df(SALES, window),
+            self.get_report_df(EXPENSES, window),
+        )
+
+    def get_report_df(
+        self, table: SharedFactTable, window: List[str]
+    ) -> pd.DataFrame:
+        """
+        Monthly totals by product or category over the report's window,
+        with the columns and order of the SQLite queries
+        """
+
+        end, last_month, start = window
+        days = self._arrays[table.fact_table]["days"]
+        if not len(days):
+            return self._get_df(table, [])
+        first_year_month = str(
+            np.datetime64(int(days[0]), "D").astype("datetime64[M]")
+        )
+        year_months = [
+            year_month
+            for year_month in self.date_utils.get_year_months_range(
+                first_year_month, self.date_utils.get_previous_year_month(end)
+            )
+            if year_month[5:] <= last_month or year_month >= start
+        ]
+        return self._get_df(table, year_months)
+
+    def get_month_df(
+        self, table: SharedFactTable, year_month: str
+    ) -> pd.DataFrame:
+        """Totals by product or category of the year-month"""
+
+        df = self._get_df(table, [year_month])
+        # Plain strings, as SQLite returns them, so the top-N bucketing can
+        # append an "Other" row that isn't one of the categories
+        return df.astype({"year_month": str, table.name_alias: str})
+
+    @classmethod
+    def _load_table(
+        cls,
+        db: Database,
+        table: SharedFactTable,
+        end_date: str,
+        segments: List[shared_memory.SharedMemory],
+    ) -> Tuple[SharedTableHandle, Dict[str, np.ndarray]]:
+        columns = "name, unit_price" if table is SALES else "name"
+        query = f"""
+            SELECT
+                {table.dim_id_column},
+                {columns}
+            FROM
+                {table.dim_table}
+            ORDER BY
+                {table.dim_id_column}
+        """
+        dims = db.fetch_all(query)
+        dim_ids = np.array([dim[0] for dim in dims], dtype=np.int64)
+        rows = db.fetch_result(
+            f"SELECT COUNT(*) FROM {table.fact_table} WHERE date < ?",
+            (end_date,),
+        )[0]
+        dtypes = {
+            "days": "int32",
+            "codes": np.min_scalar_type(max(len(dims) - 1, 0)).str,
+            "measures": table.measure_dtype,
+        }
+        shared_arrays, arrays = {}, {}
+        for column, dtype in dtypes.items():
+            shared_array, array = cls._allocate(dtype, rows, segments)
+            shared_arrays[column], arrays[column] = shared_array, array
+
+        cursor = db.conn.execute(
+            f"""
+            SELECT
+                date,
+                {table.dim_id_column},
+                {table.measure}
+            FROM
+                {table.fact_table}
+            WHERE
+                date < ?
+            ORDER BY
+                date
+            """,
+            (end_date,),
+        )
+        offset = 0
+        while True:
+            batch = cursor.fetchmany(LOAD_BATCH_ROWS)
+            if not batch:
+                break
+            dates, ids, measures = zip(*batch)
+            stop = offset + len(batch)
+            arrays["days"][offset:stop] = np.array(
+                dates, dtype="datetime64[D]"
+            ).astype(np.int32)
+            arrays["codes"][offset:stop] = np.searchsorted(dim_ids, ids)
+            arrays["measures"][offset:stop] = measures
+            offset = stop
+
+        handle = SharedTableHandle(
+            shared_arrays["days"],
+            shared_arrays["codes"],
+            shared_arrays["measures"],
+            [dim[1] for dim in dims],
+            [dim[2] for dim in dims] if table is SALES else None,
+        )
+        return handle, arrays
+
+    @staticmethod
+    def _allocate(
+        dtype: str, length: int, segments: List[shared_memory.SharedMemory]
+    ) -> Tuple[SharedArray, np.ndarray]:
+        # Zero-sized segments aren't allowed
+        size = max(np.dtype(dtype).itemsize * length, 1)
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        segments.append(segment)
+        shared_array = SharedArray(segment.name, dtype, length)
+        return shared_array, _get_array(segment, shared_array)
+
+    def _get_df(
+        self, table: SharedFactTable, year_months: List[str]
+    ) -> pd.DataFrame:
+        """
+        One row per year-month and product or category with facts, both
+        keys categorical, built from the codes with each string stored once
+        """
+
+        arrays = self._arrays[table.fact_table]
+        table_handle = self.handle.tables[table.fact_table]
+        num_dims = len(table_handle.names)
+        month_starts = np.array(
+            [
+                [year_month, self.date_utils.get_next_year_month(year_month)]
+                for year_month in year_months
+            ],
+            dtype="datetime64[D]",
+        ).reshape(-1, 2)
+        bounds = np.searchsorted(arrays["days"], month_starts.astype(np.int32))
+        totals = np.empty((len(year_months), num_dims))
+        counts = np.empty((len(year_months), num_dims), dtype=np.int64)
+        for index, (start, stop) in enumerate(bounds):
+            codes = arrays["codes"][start:stop]
+            totals[index] = np.bincount(
+                codes, arrays["measures"][start:stop], minlength=num_dims
+            )
+            counts[index] = np.bincount(codes, minlength=num_dims)
+        if table_handle.unit_prices is not None:
+            totals *= np.array(table_handle.unit_prices)
+        month_indexes, codes = np.nonzero(counts)
+        return pd.DataFrame(
+            {
+                "year_month": pd.Categorical.from_codes(
+                    month_indexes, year_months
+                ),
+                table.name_alias: pd.Categorical.from_codes(
+                    codes, table_handle.names
+                ),
+                table.total_column: totals[month_indexes, codes],
+            }
+        )
+
+
+def _get_array(
+    segment: shared_memory.SharedMemory, shared_array: SharedArray
+) -> np.ndarray:
+    return np.ndarray(
+        (shared_array.length,), dtype=shared_array.dtype, buffer=segment.buf
+    )
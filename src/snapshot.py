@@ -0,0 +1,266 @@
+import json
+import os
+import tempfile
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from . import config
+from .database import Database
+from .date_utils import DateUtils
+
+if TYPE_CHECKING:
+    import sqlite3
+
+
+class SnapshotTable(NamedTuple):
+    fact_table: str
+    dim_table: str
+    dim_id_column: str
+    measure: str
+    # Columns of the DataFrame returned, as in the SQLite queries
+    name_alias: str
+    total_column: str
+
+
+SALES = SnapshotTable(
+    "sales_fact",
+    "products_dim",
+    "product_id",
+    "quantity",
+    "product",
+    "total_sales",
+)
+
+EXPENSES = SnapshotTable(
+    "expenses_fact",
+    "expenses_categories_dim",
+    "category_id",
+    "amount",
+    "category",
+    "total_expenses",
+)
+
+
+class Snapshot:
+    """
+    Columnar copy of the fact tables, one Arrow IPC file per table and
+    year-month, read through memory maps. Months outside a report's window
+    are never opened, and the ones inside are aggregated by Arrow.
+    The snapshot is only as fresh as its last export, which rewrites just
+    the months whose data version changed since.
+    """
+
+    def __init__(self, snapshot_dir: Optional[str] = None) -> None:
+        self.snapshot_dir = snapshot_dir or config.SNAPSHOT_DIR
+        self.manifest_path = os.path.join(self.snapshot_dir, "snapshot.json")
+        self.date_utils = DateUtils()
+
+    def export(self, db: Database) -> List[str]:
+        """Bring the snapshot up to date, returning the year-months written"""
+
+        for table in (SALES, EXPENSES):
+            os.makedirs(self._get_table_dir(table), exist_ok=True)
+        versions = dict(
+            db.fetch_all("SELECT year_month, version FROM month_versions")
+        )
+        exported_versions = self.get_versions()
+        changed = sorted(
+            year_month
+            for year_month, version in versions.items()
+            if exported_versions.get(year_month) != version
+        )
+        for table in (SALES, EXPENSES):
+            self._export_dimension(db.conn, table)
+            for year_month in changed:
+                self._export_partition(db.conn, table, year_month)
+        # Written last, so an interrupted export is redone the next time
+        self._write_atomically(
+            self.manifest_path, json.dumps({"versions": versions}).encode()
+        )
+        return changed
+
+    def get_versions(self) -> Dict[str, int]:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)["versions"]
+        except FileNotFoundError:
+            return {}
+
+    def get_year_months(self) -> List[str]:
+        """Year-months with sales, as the rollup queries"""
+
+        return self._get_partitions(SALES)
+
+    def get_report_monthly_df(self, window: List[str]) -> pd.DataFrame:
+        """
+        Monthly KPIs over the report's window, with the columns of the
+        SQLite window query
+        """
+
+        from .report_dataset import get_monthly_kpis_df
+
+        return get_monthly_kpis_df(
+            self.get_report_df(SALES, window),
+            self.get_report_df(EXPENSES, window),
+        )
+
+    def get_report_df(
+        self, table: SnapshotTable, window: List[str]
+    ) -> pd.DataFrame:
+        """
+        Monthly totals by product or category over the report's window,
+        with the columns and order of the SQLite queries
+        """
+
+        end, last_month, start = window
+        return self._get_df(
+            table,
+            [
+                year_month
+                for year_month in self._get_partitions(table)
+                if year_month < end
+                and (year_month[5:] <= last_month or year_month >= start)
+            ],
+        )
+
+    def get_month_df(
+        self, table: SnapshotTable, year_month: str
+    ) -> pd.DataFrame:
+        """Totals by product or category of the year-month"""
+
+        partitions = self._get_partitions(table)
+        df = self._get_df(
+            table, [year_month] if year_month in partitions else []
+        )
+        # Plain strings, as SQLite returns them, so the top-N bucketing can
+        # append an "Other" row that isn't one of the categories
+        return df.astype({"year_month": str, table.name_alias: str})
+
+    def _get_df(
+        self, table: SnapshotTable, year_months: List[str]
+    ) -> pd.DataFrame:
+        """Both keys come categorical, each string stored once"""
+
+        partitions = [
+            self._read_arrow(self._get_partition_path(table, year_month))
+            for year_month in year_months
+        ]
+        # One aggregation over every month, keyed by the partition's index
+        month_index = np.repeat(
+            np.arange(len(partitions), dtype=np.int32),
+            [partition.num_rows for partition in partitions],
+        )
+        facts = pa.concat_tables(
+            [p.select([table.dim_id_column, table.measure]) for p in partitions]
+            or [self._get_empty_facts(table)]
+        ).append_column("month_index", pa.array(month_index))
+        monthly = facts.group_by(
+            ["month_index", table.dim_id_column]
+        ).aggregate([(table.measure, "sum")])
+        dims = self._read_arrow(self._get_dimension_path(table))
+        joined = monthly.join(
+            dims, table.dim_id_column, join_type="left outer"
+        ).sort_by(
+            [("month_index", "ascending"), (table.dim_id_column, "ascending")]
+        )
+        total = pc.cast(joined[f"{table.measure}_sum"], pa.float64())
+        if table is SALES:
+            total = pc.multiply(total, joined["unit_price"])
+        return pd.DataFrame(
+            {
+                "year_month": pd.Categorical.from_codes(
+                    joined["month_index"].to_numpy(), year_months
+                ),
+                table.name_alias: joined["name"]
+                .dictionary_encode()
+                .to_pandas(),
+                table.total_column: total.to_pandas(),
+            }
+        )
+
+    def _get_empty_facts(self, table: SnapshotTable) -> pa.Table:
+        measure_type = pa.int64() if table is SALES else pa.float64()
+        return pa.schema(
+            [(table.dim_id_column, pa.int64()), (table.measure, measure_type)]
+        ).empty_table()
+
+    def _export_dimension(
+        self, conn: "sqlite3.Connection", table: SnapshotTable
+    ) -> None:
+        cursor = conn.execute(f"SELECT * FROM {table.dim_table}")
+        self._write_table(
+            self._get_dimension_path(table), self._to_arrow(cursor)
+        )
+
+    def _export_partition(
+        self, conn: "sqlite3.Connection", table: SnapshotTable, year_month: str
+    ) -> None:
+        next_year_month = self.date_utils.get_next_year_month(year_month)
+        cursor = conn.execute(
+            f"""
+            SELECT
+                date,
+                {table.dim_id_column},
+                {table.measure}
+            FROM
+                {table.fact_table}
+            WHERE
+                date >= ? AND date < ?
+            """,
+            (f"{year_month}-01", f"{next_year_month}-01"),
+        )
+        facts = self._to_arrow(cursor)
+        path = self._get_partition_path(table, year_month)
+        if facts.num_rows:
+            facts = facts.set_column(
+                0, "date", pc.cast(facts["date"], pa.date32())
+            )
+            self._write_table(path, facts)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def _to_arrow(self, cursor: "sqlite3.Cursor") -> pa.Table:
+        names = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        columns = list(zip(*rows)) if rows else [[] for _ in names]
+        return pa.table(
+            {name: pa.array(column) for name, column in zip(names, columns)}
+        )
+
+    def _write_table(self, path: str, arrow_table: pa.Table) -> None:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+        self._write_atomically(path, sink.getvalue().to_pybytes())
+
+    def _write_atomically(self, path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read_arrow(self, path: str) -> pa.Table:
+        """Zero-copy, the pages are only read as Arrow touches them"""
+
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def _get_partitions(self, table: SnapshotTable) -> List[str]:
+        return sorted(
+            filename[: -len(".arrow")]
+            for filename in os.listdir(self._get_table_dir(table))
+            if filename.endswith(".arrow")
+        )
+
+    def _get_table_dir(self, table: SnapshotTable) -> str:
+        return os.path.join(self.snapshot_dir, table.fact_table)
+
+    def _get_partition_path(self, table: SnapshotTable, year_month: str) -> str:
+        return os.path.join(self._get_table_dir(table), f"{year_month}.arrow")
+
+    def _get_dimension_path(self, table: SnapshotTable) -> str:
+        return os.path.join(self.snapshot_dir, f"{table.dim_table}.arrow")
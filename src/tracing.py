@@ -0,0 +1,139 @@
+import json
+import os
+from contextvars import ContextVar
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Chrome trace event of a completed span, viewable in chrome://tracing
+TraceEvent = Dict[str, Any]
+
+# Tracer of the current run, None while tracing is disabled. A context
+# variable, so runs overlapping in threads each trace into their own
+_tracer: ContextVar[Optional["Tracer"]] = ContextVar("tracer", default=None)
+
+
+class Span:
+    """Records the wall and CPU time of a block, plus any arguments set"""
+
+    def __init__(
+        self, tracer: "Tracer", name: str, category: str, args: Dict
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __enter__(self) -> "Span":
+        self._start_ns = time.time_ns()
+        self._wall_start = time.perf_counter_ns()
+        self._cpu_start = time.thread_time_ns()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        wall_ns = time.perf_counter_ns() - self._wall_start
+        cpu_ns = time.thread_time_ns() - self._cpu_start
+        self.args["cpu_ms"] = round(cpu_ns / 1e6, 3)
+        self.tracer.add_events(
+            [
+                {
+                    "name": self.name,
+                    "cat": self.category,
+                    "ph": "X",
+                    "ts": self._start_ns / 1e3,
+                    "dur": wall_ns / 1e3,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": self.args,
+                }
+            ]
+        )
+
+    def set(self, **args: Any) -> None:
+        self.args.update(args)
+
+
+class _NoSpan:
+    """Shared stand-in for Span while tracing is disabled, does nothing"""
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+    def set(self, **args: Any) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.events: List[TraceEvent] = []
+        self._lock = threading.Lock()
+
+    def add_events(self, events: List[TraceEvent]) -> None:
+        with self._lock:
+            self.events.extend(events)
+
+    def save(self, trace_path: str, metadata: Optional[Dict] = None) -> None:
+        """Write the events in the Chrome trace format, which is JSON"""
+
+        os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event["ts"])
+        with open(trace_path, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": events,
+                    "displayTimeUnit": "ms",
+                    "otherData": metadata or {},
+                },
+                f,
+                indent=1,
+                default=str,
+            )
+
+
+def start() -> Tracer:
+    tracer = Tracer()
+    _tracer.set(tracer)
+    return tracer
+
+
+def stop() -> Optional[Tracer]:
+    tracer = _tracer.get()
+    _tracer.set(None)
+    return tracer
+
+
+def is_enabled() -> bool:
+    return _tracer.get() is not None
+
+
+def span(name: str, category: str, **args: Any) -> Any:
+    """
+    Time the block in a `with` statement. While tracing is disabled, this
+    returns a shared no-op span, so instrumented code costs a function call.
+    """
+
+    tracer = _tracer.get()
+    if tracer is None:
+        return _NO_SPAN
+    return Span(tracer, name, category, args)
+
+
+def add_events(events: List[TraceEvent]) -> None:
+    """Merge the events traced in another process"""
+
+    tracer = _tracer.get()
+    if tracer is not None:
+        tracer.add_events(events)
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from src.batch import BatchReport
+from src.data_manager import DataManager
+from src.report_manifest import ReportManifest
+from src.schema import SQL_PATH, Schema
+
+INSERT_SALE = """
+    INSERT INTO sales_fact (date, product_id, quantity) VALUES (?, 1, ?)
+"""
+
+REPORT_YEAR_MONTHS = [
+    "2023-02",
+    "2023-03",
+    "2023-12",
+    "2024-02",
+    "2024-03",
+    "2025-02",
+    "2025-03",
+]
+
+
+class UpdateReportsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "test.db")
+        self.docs_path = os.path.join(self.tmp_dir.name, "docs")
+        os.mkdir(self.docs_path)
+        conn = sqlite3.connect(self.db_path)
+        with open(os.path.join(SQL_PATH, "tables_creation.sql")) as f:
+            conn.executescript(f.read())
+        conn.execute("INSERT INTO products_dim VALUES (1, 'Product', 10.0)")
+        conn.executemany(
+            INSERT_SALE,
+            [(f"{year_month}-15", 1) for year_month in REPORT_YEAR_MONTHS],
+        )
+        conn.commit()
+        conn.close()
+        Schema(self.db_path).migrate()
+
+        # Every report is up to date with the data as it is now
+        manifest = ReportManifest(self.docs_path)
+        dm = DataManager(self.db_path)
+        for year_month in REPORT_YEAR_MONTHS:
+            path = os.path.join(
+                self.docs_path, f"generated_report_{year_month}.pdf"
+            )
+            open(path, "wb").close()
+            manifest.record(year_month, dm.get_report_versions(year_month))
+        dm.db.disconnect()
+        manifest.save()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def get_stale_year_months(self) -> list:
+        batch = BatchReport(self.db_path)
+        with mock.patch(
+            "src.report_manifest.DOCS_PATH", self.docs_path
+        ), mock.patch.object(
+            batch, "generate_reports", return_value=True
+        ) as generate_reports:
+            self.assertTrue(batch.update_reports(workers=1))
+        if not generate_reports.called:
+            return []
+        return generate_reports.call_args.args[0]
+
+    def test_up_to_date_reports(self) -> None:
+        self.assertEqual(self.get_stale_year_months(), [])
+
+    def test_back_dated_fact_marks_its_dependents_stale(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute(INSERT_SALE, ("2023-03-20", 5))
+        conn.close()
+
+        # Its own month, the 12 months after it, and the same and later
+        # months of the following years, for the homologous and YTD ones
+        self.assertEqual(
+            self.get_stale_year_months(),
+            ["2023-03", "2023-12", "2024-02", "2024-03", "2025-03"],
+        )
+
+    def test_saved_manifest_is_readable_by_everyone(self) -> None:
+        mode = os.stat(os.path.join(self.docs_path, "manifest.json")).st_mode
+        self.assertEqual(mode & 0o777, 0o644)
+
+
+if __name__ == "__main__":
+    unittest.main()
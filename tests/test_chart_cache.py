@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.chart_cache import ChartCache
+
+
+class ChartCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ChartCache(self.tmp_dir.name, max_bytes=1024)
+        self.df = pd.DataFrame(
+            {"year_month": ["2024-01", "2024-02"], "sales": [10.0, 20.0]}
+        )
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def get_key(self, df: pd.DataFrame, profile="vector", dpi=100) -> str:
+        return self.cache.get_key("sales_chart", df, profile, dpi)
+
+    def get_cached_files(self) -> list:
+        return sorted(os.listdir(self.cache.cache_dir))
+
+    def test_same_dataframe_same_key(self) -> None:
+        self.assertEqual(self.get_key(self.df), self.get_key(self.df.copy()))
+
+    def test_changes_change_the_key(self) -> None:
+        changed_value = self.df.copy()
+        changed_value.loc[1, "sales"] = 21.0
+        changed_dtype = self.df.astype({"sales": "float32"})
+        key = self.get_key(self.df)
+
+        self.assertNotEqual(key, self.get_key(changed_value))
+        self.assertNotEqual(key, self.get_key(changed_dtype))
+        self.assertNotEqual(key, self.get_key(self.df, profile="png"))
+        self.assertNotEqual(key, self.get_key(self.df, dpi=150))
+        self.assertNotEqual(
+            key, self.cache.get_key("expenses_chart", self.df, "vector", 100)
+        )
+
+    def test_put_then_get(self) -> None:
+        key = self.get_key(self.df)
+        self.assertIsNone(self.cache.get(key))
+
+        self.cache.put(key, b"chart")
+
+        self.assertEqual(self.cache.get(key), b"chart")
+
+    def test_failed_put_keeps_the_cached_chart(self) -> None:
+        key = self.get_key(self.df)
+        self.cache.put(key, b"chart")
+
+        with self.assertRaises(TypeError):
+            self.cache.put(key, "not bytes")  # Fails while writing
+
+        self.assertEqual(self.cache.get(key), b"chart")
+        self.assertEqual(self.get_cached_files(), [f"{key}.chart"])
+
+    def test_evict_least_recently_used(self) -> None:
+        keys = [f"{index:064x}" for index in range(4)]
+        for index, key in enumerate(keys[:3]):
+            self.cache.put(key, bytes(400))
+            # One second apart, older than the charts written next
+            path = os.path.join(self.cache.cache_dir, f"{key}.chart")
+            os.utime(path, (1000 + index, 1000 + index))
+
+        # The oldest went once the third took the cache past 1024 bytes
+        self.assertEqual(
+            self.get_cached_files(), [f"{keys[1]}.chart", f"{keys[2]}.chart"]
+        )
+
+        self.cache.get(keys[1])  # Now more recently used than the third
+        self.cache.put(keys[3], bytes(400))
+
+        self.assertEqual(
+            self.get_cached_files(), [f"{keys[1]}.chart", f"{keys[3]}.chart"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from src.data_manager import DataManager
+from src.kpi_engine import KpiEngine, to_json_number
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The sample database shipped with the repository
+SAMPLE_DB_PATH = os.path.join(ROOT_PATH, "database.db")
+
+# Exporting the whole history has to stay well under a second
+EXPORT_BUDGET_S = 1.0
+
+
+class KpiEngineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # Opening it migrates and refreshes the rollups, so use a copy
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "database.db")
+        shutil.copy(SAMPLE_DB_PATH, self.db_path)
+        self.dm = DataManager(self.db_path, backend="sqlite")
+
+    def tearDown(self) -> None:
+        self.dm.db.disconnect()
+        self.tmp_dir.cleanup()
+
+    def get_year_months(self) -> list:
+        """The first month has no in-chain change, unlike the second"""
+
+        first_ym = self.dm.get_first_db_year_month()
+        second_ym = self.dm.date_utils.get_next_year_month(first_ym)
+        latest_ym = self.dm.get_latest_db_year_month()
+        middle_ym = f"{int(latest_ym[:4]) - 1}-06"
+        return [first_ym, second_ym, middle_ym, latest_ym]
+
+    def test_export_matches_the_report_dataset(self) -> None:
+        path = os.path.join(self.tmp_dir.name, "kpis.json")
+        subprocess.run(
+            [
+                sys.executable,
+                "main.py",
+                "--db",
+                self.db_path,
+                "--export-kpis",
+                path,
+            ],
+            cwd=ROOT_PATH,
+            capture_output=True,
+            check=True,
+        )
+        with open(path) as f:
+            exported = json.load(f)
+
+        for year_month in self.get_year_months():
+            expected = {
+                "month_overview": self.dm.get_month_overview(year_month),
+                "homologous_performance": (
+                    self.dm.get_homologous_performance(year_month)
+                ),
+                "in_chain_performance": (
+                    self.dm.get_in_chain_performance(year_month)
+                ),
+            }
+            for section, kpis in expected.items():
+                self.assertEqual(
+                    exported[year_month][section].keys(), kpis.keys()
+                )
+                for kpi, value in kpis.items():
+                    with self.subTest(year_month, section=section, kpi=kpi):
+                        actual = exported[year_month][section][kpi]
+                        value = to_json_number(value)
+                        if value is None:
+                            self.assertIsNone(actual)
+                        else:
+                            self.assertAlmostEqual(actual, value, places=6)
+
+    def test_export_within_the_time_budget(self) -> None:
+        engine = KpiEngine(self.db_path)
+        path = os.path.join(self.tmp_dir.name, "kpis.json")
+
+        start = time.perf_counter()
+        months = engine.export(path)
+        duration = time.perf_counter() - start
+
+        self.assertGreater(months, 12)
+        self.assertLess(duration, EXPORT_BUDGET_S)
+
+
+if __name__ == "__main__":
+    unittest.main()
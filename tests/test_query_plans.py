@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.data_manager import DataManager
+from src.database import FullScanError
+
+# The sample database shipped with the repository
+SAMPLE_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database.db"
+)
+
+
+class QueryPlansTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # Opening it migrates and refreshes the rollups, so use a copy
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.tmp_dir.name, "database.db")
+        shutil.copy(SAMPLE_DB_PATH, db_path)
+        self.dm = DataManager(db_path, backend="sqlite")
+
+    def tearDown(self) -> None:
+        self.dm.db.disconnect()
+        self.tmp_dir.cleanup()
+
+    def test_report_queries_use_indexes(self) -> None:
+        first_ym = self.dm.get_first_db_year_month()
+        latest_ym = self.dm.get_latest_db_year_month()
+        for year_month in (first_ym, latest_ym):
+            with self.subTest(year_month=year_month):
+                self.dm.check_query_plans(year_month)
+
+    def test_full_scan_raises(self) -> None:
+        self.dm.db.check_query_plans = True
+        with self.assertRaisesRegex(FullScanError, "SCAN sales_fact"):
+            self.dm.db.fetch_result("SELECT SUM(quantity) FROM sales_fact")
+
+
+if __name__ == "__main__":
+    unittest.main()
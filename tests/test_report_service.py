@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from src.report_service import ReportHTTPServer, ReportService
+
+# The sample database shipped with the repository
+SAMPLE_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database.db"
+)
+
+
+class ReportServiceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # Opening it migrates and refreshes the rollups, so use a copy
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.tmp_dir.name, "database.db")
+        shutil.copy(SAMPLE_DB_PATH, db_path)
+        self.service = ReportService(db_path, workers=2, max_pending=1)
+        self.latest_ym = self.service.get_months()["latest"]
+
+        # Builds the KPIs as usual, counting the builds by year-month
+        self.builds = []
+        self.release_builds = threading.Event()
+        self.release_builds.set()
+        build_kpis = self.service._build_kpis
+
+        def counted_build_kpis(year_month: str) -> dict:
+            self.builds.append(year_month)
+            self.release_builds.wait()
+            return build_kpis(year_month)
+
+        self.service._build_kpis = counted_build_kpis
+
+        self.server = ReportHTTPServer(("127.0.0.1", 0), self.service)
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+
+    def tearDown(self) -> None:
+        self.release_builds.set()
+        self.server.shutdown()
+        self.server_thread.join()
+        self.server.server_close()
+        self.service.shutdown()
+        self.service.bar.dm.db.disconnect()
+        self.tmp_dir.cleanup()
+
+    def get_kpis(self, year_month: str) -> dict:
+        url = f"http://127.0.0.1:{self.server.server_port}/kpis/{year_month}"
+        with urllib.request.urlopen(url, timeout=60) as response:
+            return json.load(response)
+
+    def test_identical_requests_share_a_build(self) -> None:
+        self.release_builds.clear()
+        with ThreadPoolExecutor(2) as executor:
+            first = executor.submit(self.get_kpis, self.latest_ym)
+            second = executor.submit(self.get_kpis, self.latest_ym)
+            # The second joins the build while it waits to be released
+            while not self.builds:
+                time.sleep(0.01)
+            time.sleep(0.2)
+            self.release_builds.set()
+            kpis = first.result(), second.result()
+
+        self.assertEqual(self.builds, [self.latest_ym])
+        self.assertEqual(kpis[0], kpis[1])
+        self.assertIn("month_overview", kpis[0])
+
+    def test_busy_when_the_pending_builds_are_full(self) -> None:
+        self.release_builds.clear()
+        with ThreadPoolExecutor(1) as executor:
+            pending = executor.submit(self.get_kpis, self.latest_ym)
+            while not self.builds:
+                time.sleep(0.01)
+
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                self.get_kpis(
+                    f"{int(self.latest_ym[:4]) - 1}{self.latest_ym[4:]}"
+                )
+            self.release_builds.set()
+            pending.result()
+
+        self.assertEqual(error.exception.code, 503)
+        self.assertEqual(error.exception.headers["Retry-After"], "1")
+
+    def test_least_recently_used_evicted(self) -> None:
+        year = int(self.latest_ym[:4])
+        year_months = [
+            f"{year - offset}{self.latest_ym[4:]}" for offset in range(3)
+        ]
+        with mock.patch("src.report_service.CACHE_ENTRIES", 2):
+            self.get_kpis(year_months[0])
+            self.get_kpis(year_months[1])
+            self.get_kpis(year_months[0])  # Cached, now the most recent
+            self.get_kpis(year_months[2])  # Evicts the second
+            self.get_kpis(year_months[0])
+            self.get_kpis(year_months[1])
+
+        self.assertEqual(
+            self.builds,
+            [year_months[0], year_months[1], year_months[2], year_months[1]],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
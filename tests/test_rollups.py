@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from src.rollups import Rollups
+from src.schema import SQL_PATH, Schema
+
+INSERT_SALE = """
+    INSERT INTO sales_fact (date, product_id, quantity) VALUES (?, 1, ?)
+"""
+
+
+class RollupsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "test.db")
+        conn = sqlite3.connect(self.db_path)
+        with open(os.path.join(SQL_PATH, "tables_creation.sql")) as f:
+            conn.executescript(f.read())
+        conn.execute("INSERT INTO products_dim VALUES (1, 'Product', 10.0)")
+        conn.commit()
+        conn.close()
+        Schema(self.db_path).migrate()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def execute(self, query: str, params: tuple = ()) -> list:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                return conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+    def get_rollup_quantity(self, year_month: str) -> int:
+        return self.execute(
+            """
+            SELECT quantity FROM monthly_sales_by_product
+            WHERE year_month = ?
+            """,
+            (year_month,),
+        )[0][0]
+
+    def test_reused_id_after_deleting_the_newest_row(self) -> None:
+        self.execute(INSERT_SALE, ("2024-12-01", 10))
+        self.execute(INSERT_SALE, ("2024-12-02", 20))
+        Rollups(self.db_path).refresh()
+        self.execute("DELETE FROM sales_fact WHERE sale_id = 2")
+        Rollups(self.db_path).refresh()
+        self.execute(INSERT_SALE, ("2024-12-03", 70))
+        self.assertEqual(
+            self.execute("SELECT MAX(sale_id) FROM sales_fact"), [(2,)]
+        )
+        Rollups(self.db_path).refresh()
+        self.assertEqual(self.get_rollup_quantity("2024-12"), 80)
+
+    def test_fact_outside_the_calendar(self) -> None:
+        self.execute(INSERT_SALE, ("1969-12-31", 5))
+        Rollups(self.db_path).refresh()
+        self.assertEqual(self.get_rollup_quantity("1969-12"), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
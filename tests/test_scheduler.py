@@ -0,0 +1,79 @@
+import threading
+import time
+import unittest
+
+from src.scheduler import Step, StepScheduler
+
+
+class StepSchedulerTest(unittest.TestCase):
+    def test_outputs_passed_to_dependents(self) -> None:
+        steps = [
+            Step("a", lambda: 1),
+            Step("b", lambda a: a + 1, ("a",)),
+            Step("c", lambda a, b: a * 10 + b, ("a", "b")),
+        ]
+
+        outputs = StepScheduler(workers=2).run(steps)
+
+        self.assertEqual(outputs, {"a": 1, "b": 2, "c": 12})
+
+    def test_dependency_cycle(self) -> None:
+        steps = [
+            Step("a", lambda c: c, ("c",)),
+            Step("b", lambda a: a, ("a",)),
+            Step("c", lambda b: b, ("b",)),
+        ]
+
+        with self.assertRaisesRegex(ValueError, "Dependency cycle"):
+            StepScheduler(workers=1).run(steps)
+
+    def test_only_the_targets_dependencies_run(self) -> None:
+        called = []
+
+        def make_step(name: str, *inputs: str) -> Step:
+            return Step(name, lambda *_: called.append(name) or name, inputs)
+
+        steps = [
+            make_step("a"),
+            make_step("b", "a"),
+            make_step("c", "b"),
+            make_step("d"),
+        ]
+
+        outputs = StepScheduler(workers=2).run(steps, targets=["b"])
+
+        self.assertEqual(outputs, {"a": "a", "b": "b"})
+        self.assertCountEqual(called, ["a", "b"])
+
+    def test_failure_cancels_the_remaining_steps(self) -> None:
+        slow_started = threading.Event()
+        called = []
+
+        def fail() -> None:
+            slow_started.wait()
+            raise RuntimeError("Step failed")
+
+        def slow() -> None:
+            slow_started.set()
+            # Still running when the failure is handled
+            time.sleep(0.2)
+            called.append("slow")
+
+        steps = [
+            Step("fail", fail),
+            Step("slow", slow),
+            Step(
+                "after_slow", lambda _: called.append("after_slow"), ("slow",)
+            ),
+            Step("dependent", lambda _: called.append("dependent"), ("fail",)),
+        ]
+
+        with self.assertRaisesRegex(RuntimeError, "Step failed"):
+            StepScheduler(workers=2).run(steps)
+
+        # The started step was waited for, the others never ran
+        self.assertEqual(called, ["slow"])
+
+
+if __name__ == "__main__":
+    unittest.main()
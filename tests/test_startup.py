@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from benchmarks.startup_budget import (
+    STARTUP_BUDGET_MS,
+    get_heavy_modules,
+    get_import_times,
+    get_total_ms,
+)
+from src.schema import SQL_PATH, Schema
+
+
+class StartupTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "test.db")
+        conn = sqlite3.connect(self.db_path)
+        with open(os.path.join(SQL_PATH, "tables_creation.sql")) as f:
+            conn.executescript(f.read())
+        conn.execute("INSERT INTO products_dim VALUES (1, 'Product', 10.0)")
+        conn.execute("""
+            INSERT INTO sales_fact (date, product_id, quantity)
+            VALUES ('2024-01-15', 1, 1)
+            """)
+        conn.commit()
+        conn.close()
+        Schema(self.db_path).migrate()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_list_months_within_the_startup_budget(self) -> None:
+        import_times = get_import_times(
+            ["main.py", "--db", self.db_path, "--list-months"]
+        )
+
+        self.assertEqual(get_heavy_modules(import_times), [])
+        self.assertLessEqual(get_total_ms(import_times), STARTUP_BUDGET_MS)
+
+
+if __name__ == "__main__":
+    unittest.main()